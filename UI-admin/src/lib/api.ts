@@ -13,6 +13,19 @@ export function clearAdminToken(): void {
   localStorage.removeItem(ADMIN_TOKEN_KEY);
 }
 
+export function adminLogout(): Promise<void> {
+  const token = getAdminToken();
+  if (!token) return Promise.resolve();
+  // Best effort: the local token is cleared either way
+  return fetch(`${API_BASE}/api/admin/logout`, {
+    method: 'POST',
+    headers: { Authorization: `Bearer ${token}` },
+  }).then(
+    () => undefined,
+    () => undefined,
+  );
+}
+
 async function request<T>(path: string, options: RequestInit = {}): Promise<T> {
   const headers = new Headers(options.headers || {});
   if (!(options.body instanceof FormData)) {
@@ -115,6 +128,20 @@ export interface PDFDoc {
   download_count?: number;
 }
 
+export interface PdfIngestionJob {
+  id: string;
+  filename: string;
+  original_name: string;
+  content_hash: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  stage: string;
+  pages_total: number;
+  pages_parsed: number;
+  chunks_total: number;
+  chunks_embedded: number;
+  error: string;
+}
+
 export interface DownloadEvent {
   _id: string;
   pdf_id: string;
@@ -265,10 +292,14 @@ export function importStudents(file: File, defaultPassword: string, replaceExist
     return response.json() as Promise<{
       ok: boolean;
       imported_count: number;
+      failed_count: number;
       skipped_count: number;
       programs: Record<string, number>;
       source_file: string;
       replace_existing: boolean;
+      elapsed_seconds: number;
+      rows_per_second: number;
+      batch_errors: { batch: number; errors: { student_id: string; error: string }[] }[];
     }>;
   });
 }
@@ -324,7 +355,28 @@ export async function uploadPdf(file: File) {
     throw new Error(body || `Upload failed: ${response.status}`);
   }
 
-  return response.json();
+  // duplicate=true: the same file was already ingested (pdf) or is being ingested right now (job)
+  return response.json() as Promise<{
+    ok: boolean;
+    duplicate: boolean;
+    job_id: string;
+    status: string;
+    job?: PdfIngestionJob;
+    pdf?: PDFDoc;
+  }>;
+}
+
+export function getPdfJob(jobId: string) {
+  return request<PdfIngestionJob>(`/api/admin/pdfs/jobs/${jobId}`);
+}
+
+export async function waitForPdfJob(jobId: string, onProgress?: (job: PdfIngestionJob) => void): Promise<PdfIngestionJob> {
+  for (;;) {
+    const job = await getPdfJob(jobId);
+    onProgress?.(job);
+    if (job.status === 'succeeded' || job.status === 'failed') return job;
+    await new Promise((resolve) => setTimeout(resolve, 1000));
+  }
 }
 
 export function deletePdf(id: string, filename: string) {
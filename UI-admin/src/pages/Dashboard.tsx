@@ -28,6 +28,7 @@ import {
   addFaq,
   addStudent,
   adminLogin,
+  adminLogout,
   clearAdminToken,
   deleteStudent,
   deleteExam,
@@ -47,6 +48,7 @@ import {
   updateStudent,
   upsertFeeLedger,
   uploadPdf,
+  waitForPdfJob,
   recordFaqFeedback,
   sendFeeReminder,
 } from '../lib/api';
@@ -248,6 +250,7 @@ export default function Dashboard() {
   };
 
   const handleLogout = () => {
+    void adminLogout();
     clearAdminToken();
     setAuthenticated(false);
     setAdminPassword('');
@@ -684,7 +687,20 @@ export default function Dashboard() {
                       if (!pdfFile) return;
                       try {
                         setPdfMessage('Uploading...');
-                        await uploadPdf(pdfFile);
+                        const upload = await uploadPdf(pdfFile);
+                        if (upload.duplicate && !upload.job_id) {
+                          setPdfMessage(`This file is already uploaded as "${upload.pdf?.original_name || upload.pdf?.filename}".`);
+                          setPdfFile(null);
+                          return;
+                        }
+                        const job = await waitForPdfJob(upload.job_id, (j) =>
+                          setPdfMessage(
+                            j.status === 'queued'
+                              ? 'Queued for processing...'
+                              : `Processing: ${j.pages_parsed}/${j.pages_total || '?'} pages, ${j.chunks_embedded}/${j.chunks_total || '?'} chunks embedded`,
+                          ),
+                        );
+                        if (job.status === 'failed') throw new Error(job.error || 'PDF processing failed.');
                         setPdfMessage('PDF uploaded and processed successfully.');
                         setPdfFile(null);
                         await loadAll();
@@ -38,6 +38,19 @@ export function clearStudentToken(): void {
   localStorage.removeItem(STUDENT_TOKEN_KEY);
 }
 
+export function studentLogout(): Promise<void> {
+  const token = getStudentToken();
+  if (!token) return Promise.resolve();
+  // Best effort: the local token is cleared either way
+  return fetch(`${API_BASE}/api/student/logout`, {
+    method: 'POST',
+    headers: { Authorization: `Bearer ${token}` },
+  }).then(
+    () => undefined,
+    () => undefined,
+  );
+}
+
 async function request<T>(path: string, options: RequestInit = {}, withStudentAuth = false): Promise<T> {
   const headers = new Headers(options.headers || {});
   if (!(options.body instanceof FormData)) {
@@ -147,8 +160,8 @@ export function getStudentDocuments() {
   return request<{ items: StudentDocument[] }>('/api/student/documents', {}, true);
 }
 
-export function changeStudentPassword(currentPassword: string, newPassword: string) {
-  return request<{ ok: boolean }>(
+export async function changeStudentPassword(currentPassword: string, newPassword: string) {
+  const res = await request<{ ok: boolean; token?: string; expires_at?: string }>(
     '/api/student/change-password',
     {
       method: 'POST',
@@ -159,6 +172,9 @@ export function changeStudentPassword(currentPassword: string, newPassword: stri
     },
     true,
   );
+  // Signed-token mode revokes every older token, including the one just used
+  if (res.token) setStudentToken(res.token, res.expires_at);
+  return res;
 }
 
 export function buildStudentDocumentDownloadUrl(pdfId: string): string {
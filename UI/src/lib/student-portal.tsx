@@ -8,6 +8,7 @@ import {
   getStudentReminders,
   markStudentRemindersRead,
   studentLogin,
+  studentLogout,
 } from './api';
 import type { StudentDocument, StudentFeeLedger, StudentProfile, StudentReminder } from './api';
 
@@ -95,6 +96,7 @@ export function StudentPortalProvider({ children }: { children: ReactNode }) {
         setAuthenticated(true);
       },
       logout: () => {
+        void studentLogout();
         clearStudentToken();
         setAuthenticated(false);
         setStudent(null);
@@ -1,7 +1,18 @@
-import requests
+import json
 import os
+from typing import AsyncIterator, Iterator
+
+import requests
 from dotenv import load_dotenv
 
+from utils.ollama_client import (
+    GENERATE_READ_TIMEOUT,
+    async_timeout,
+    get_async_client,
+    get_session,
+    request_timeout,
+)
+
 load_dotenv()
 
 # Ollama runs as a local server at this address
@@ -9,6 +20,47 @@ OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
 MODEL_NAME = os.getenv("OLLAMA_MODEL", "phi3:mini")
 
 
+class FallbackText(str):
+    """
+    An error/fallback message standing in for (part of) an answer.
+
+    It is still a str, so callers can show it like any other text, but
+    isinstance(text, FallbackText) tells a failed generation apart from a
+    real answer even when the streamed fragments are joined afterwards.
+    """
+
+
+# User-facing fallbacks shared by the blocking and streaming generators
+EMPTY_RESPONSE_MESSAGE = FallbackText(
+    "I received an empty response from the AI. "
+    "Please try asking your question again."
+)
+TIMEOUT_MESSAGE = FallbackText(
+    "⏳ **The AI is taking longer than expected.**\n\n"
+    "phi3:mini sometimes takes up to 2 minutes on the first query "
+    "while it loads the model into memory.\n\n"
+    "Please try again — it should be faster now that the model is loaded."
+)
+CONNECTION_ERROR_MESSAGE = FallbackText(
+    "❌ **Cannot connect to the local AI.**\n\n"
+    "Ollama doesn't seem to be running.\n\n"
+    "**Fix:** Open a terminal and run: `ollama serve`\n"
+    "Then refresh this page."
+)
+
+
+def is_fallback_message(text: str) -> bool:
+    """True for the error/fallback texts above (never worth caching or reusing)."""
+    if isinstance(text, FallbackText):
+        return True
+    text = (text or "").strip()
+    if not text:
+        return True
+    if text in (EMPTY_RESPONSE_MESSAGE, TIMEOUT_MESSAGE, CONNECTION_ERROR_MESSAGE):
+        return True
+    return text.startswith(("⚠️ The AI returned an error", "❌ An unexpected error occurred"))
+
+
 class ResponseGenerationAgent:
     """
     Generates AI responses using the local phi3:mini model via Ollama.
@@ -79,22 +131,11 @@ class ResponseGenerationAgent:
 
         return "\n".join(parts)
 
-    def generate(self, student_query: str, retrieved_data: dict) -> str:
+    def build_prompt(self, student_query: str, retrieved_data: dict) -> str:
         """
-        Generate a helpful response using phi3:mini.
-
-        Parameters:
-            student_query  (str):  The student's original question
-            retrieved_data (dict): Data from InformationRetrievalAgent
-
-        Returns:
-            str: The AI-generated response
-
-        About phi3:mini:
-        - Size: 3.8 billion parameters
-        - RAM needed: ~4GB
-        - Speed: 10–60 seconds per response (depends on your hardware)
-        - Quality: Very good for factual Q&A with provided context
+        Build the phi3 prompt for a question and its retrieved context.
+        Shared by generate() and generate_stream() so both paths send
+        exactly the same instructions to the model.
         """
         # Build the context string from database results
         context = self.format_context(retrieved_data)
@@ -129,24 +170,49 @@ class ResponseGenerationAgent:
             "<|end|>\n"
             "<|assistant|>\n"
         )
+        return prompt
+
+    def _request_body(self, prompt: str, stream: bool) -> dict:
+        """JSON body for Ollama's /api/generate endpoint."""
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": 0.3,    # Low = more factual, less creative
+                "num_predict": 220,    # Lower token cap improves latency for portal-style answers
+                "top_p": 0.9,          # Controls response diversity
+                "repeat_penalty": 1.1  # Prevents repetitive output
+            }
+        }
+
+    def generate(self, student_query: str, retrieved_data: dict) -> str:
+        """
+        Generate a helpful response using phi3:mini.
+
+        Parameters:
+            student_query  (str):  The student's original question
+            retrieved_data (dict): Data from InformationRetrievalAgent
+
+        Returns:
+            str: The AI-generated response
+
+        About phi3:mini:
+        - Size: 3.8 billion parameters
+        - RAM needed: ~4GB
+        - Speed: 10–60 seconds per response (depends on your hardware)
+        - Quality: Very good for factual Q&A with provided context
+        """
+        prompt = self.build_prompt(student_query, retrieved_data)
 
         try:
             print(f"🧠 Response Agent: Sending query to {MODEL_NAME}...")
 
-            response = requests.post(
+            # Pooled keep-alive session: no new TCP connection per chat turn
+            response = get_session().post(
                 self.api_url,
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,       # Get the full response at once (not streaming)
-                    "options": {
-                        "temperature": 0.3,    # Low = more factual, less creative
-                        "num_predict": 220,    # Lower token cap improves latency for portal-style answers
-                        "top_p": 0.9,          # Controls response diversity
-                        "repeat_penalty": 1.1  # Prevents repetitive output
-                    }
-                },
-                timeout=180  # 3 minutes max — phi3 can be slow on first load
+                json=self._request_body(prompt, stream=False),  # Get the full response at once
+                timeout=request_timeout(GENERATE_READ_TIMEOUT)  # 3 minutes by default — phi3 can be slow on first load
             )
 
             if response.status_code == 200:
@@ -157,36 +223,196 @@ class ResponseGenerationAgent:
                     print(f"✅ Response generated: {len(generated_text)} characters")
                     return generated_text
                 else:
-                    return (
-                        "I received an empty response from the AI. "
-                        "Please try asking your question again."
-                    )
+                    return EMPTY_RESPONSE_MESSAGE
 
             else:
-                return (
+                return FallbackText(
                     f"⚠️ The AI returned an error (HTTP {response.status_code}). "
                     "Please try again in a moment."
                 )
 
         except requests.exceptions.Timeout:
-            return (
-                "⏳ **The AI is taking longer than expected.**\n\n"
-                "phi3:mini sometimes takes up to 2 minutes on the first query "
-                "while it loads the model into memory.\n\n"
-                "Please try again — it should be faster now that the model is loaded."
+            return TIMEOUT_MESSAGE
+
+        except requests.exceptions.ConnectionError:
+            return CONNECTION_ERROR_MESSAGE
+
+        except Exception as e:
+            print(f"❌ Unexpected error in ResponseAgent: {e}")
+            return FallbackText(
+                f"❌ An unexpected error occurred: {str(e)}\n\n"
+                "Please try again or contact technical support."
             )
 
+    def generate_stream(self, student_query: str, retrieved_data: dict) -> Iterator[str]:
+        """
+        Same as generate(), but yields text fragments as Ollama produces them.
+
+        Ollama's streaming mode returns one JSON object per line
+        (NDJSON), each carrying the next few tokens in "response" and
+        "done": true on the last line. Relaying those fragments straight
+        away means the student sees the first words in about a second
+        instead of waiting for the whole answer.
+
+        Errors are yielded as a single friendly FallbackText, exactly like
+        generate() returns them, so callers never need a try/except; one
+        can arrive after some real text if the stream breaks midway.
+        """
+        prompt = self.build_prompt(student_query, retrieved_data)
+
+        try:
+            print(f"🧠 Response Agent: Streaming query to {MODEL_NAME}...")
+
+            with get_session().post(
+                self.api_url,
+                json=self._request_body(prompt, stream=True),
+                timeout=request_timeout(GENERATE_READ_TIMEOUT),
+                stream=True,
+            ) as response:
+                if response.status_code != 200:
+                    yield FallbackText(
+                        f"⚠️ The AI returned an error (HTTP {response.status_code}). "
+                        "Please try again in a moment."
+                    )
+                    return
+
+                total_chars = 0
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        yield FallbackText(f"⚠️ The AI returned an error: {chunk['error']}")
+                        return
+                    text = chunk.get("response", "")
+                    if text:
+                        # phi3 often opens with whitespace; drop it like generate() does
+                        if total_chars == 0:
+                            text = text.lstrip()
+                            if not text:
+                                continue
+                        total_chars += len(text)
+                        yield text
+                    if chunk.get("done"):
+                        break
+
+                if total_chars == 0:
+                    yield EMPTY_RESPONSE_MESSAGE
+                else:
+                    print(f"✅ Response streamed: {total_chars} characters")
+
+        except requests.exceptions.Timeout:
+            yield TIMEOUT_MESSAGE
+
         except requests.exceptions.ConnectionError:
-            return (
-                "❌ **Cannot connect to the local AI.**\n\n"
-                "Ollama doesn't seem to be running.\n\n"
-                "**Fix:** Open a terminal and run: `ollama serve`\n"
-                "Then refresh this page."
+            yield CONNECTION_ERROR_MESSAGE
+
+        except Exception as e:
+            print(f"❌ Unexpected error in ResponseAgent stream: {e}")
+            yield FallbackText(
+                f"❌ An unexpected error occurred: {str(e)}\n\n"
+                "Please try again or contact technical support."
             )
 
+    async def agenerate(self, student_query: str, retrieved_data: dict) -> str:
+        """
+        Asyncio version of generate() for the FastAPI chat endpoint.
+
+        Awaiting the HTTP call instead of blocking a worker thread means a
+        slow generation costs the server nothing but an open socket.
+        """
+        import httpx
+
+        prompt = self.build_prompt(student_query, retrieved_data)
+
+        try:
+            print(f"🧠 Response Agent: Sending query to {MODEL_NAME} (async)...")
+            response = await get_async_client().post(
+                self.api_url,
+                json=self._request_body(prompt, stream=False),
+                timeout=async_timeout(GENERATE_READ_TIMEOUT),
+            )
+
+            if response.status_code != 200:
+                return FallbackText(
+                    f"⚠️ The AI returned an error (HTTP {response.status_code}). "
+                    "Please try again in a moment."
+                )
+
+            generated_text = response.json().get("response", "").strip()
+            if not generated_text:
+                return EMPTY_RESPONSE_MESSAGE
+            print(f"✅ Response generated: {len(generated_text)} characters")
+            return generated_text
+
+        except httpx.TimeoutException:
+            return TIMEOUT_MESSAGE
+
+        except httpx.ConnectError:
+            return CONNECTION_ERROR_MESSAGE
+
         except Exception as e:
             print(f"❌ Unexpected error in ResponseAgent: {e}")
-            return (
+            return FallbackText(
+                f"❌ An unexpected error occurred: {str(e)}\n\n"
+                "Please try again or contact technical support."
+            )
+
+    async def agenerate_stream(self, student_query: str, retrieved_data: dict) -> AsyncIterator[str]:
+        """Asyncio version of generate_stream(); yields text fragments as they arrive."""
+        import httpx
+
+        prompt = self.build_prompt(student_query, retrieved_data)
+
+        try:
+            print(f"🧠 Response Agent: Streaming query to {MODEL_NAME} (async)...")
+
+            async with get_async_client().stream(
+                "POST",
+                self.api_url,
+                json=self._request_body(prompt, stream=True),
+                timeout=async_timeout(GENERATE_READ_TIMEOUT),
+            ) as response:
+                if response.status_code != 200:
+                    yield FallbackText(
+                        f"⚠️ The AI returned an error (HTTP {response.status_code}). "
+                        "Please try again in a moment."
+                    )
+                    return
+
+                total_chars = 0
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        yield FallbackText(f"⚠️ The AI returned an error: {chunk['error']}")
+                        return
+                    text = chunk.get("response", "")
+                    if text:
+                        if total_chars == 0:
+                            text = text.lstrip()
+                            if not text:
+                                continue
+                        total_chars += len(text)
+                        yield text
+                    if chunk.get("done"):
+                        break
+
+                if total_chars == 0:
+                    yield EMPTY_RESPONSE_MESSAGE
+                else:
+                    print(f"✅ Response streamed: {total_chars} characters")
+
+        except httpx.TimeoutException:
+            yield TIMEOUT_MESSAGE
+
+        except httpx.ConnectError:
+            yield CONNECTION_ERROR_MESSAGE
+
+        except Exception as e:
+            print(f"❌ Unexpected error in ResponseAgent stream: {e}")
+            yield FallbackText(
                 f"❌ An unexpected error occurred: {str(e)}\n\n"
                 "Please try again or contact technical support."
             )
@@ -1,3 +1,34 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# Retrieval sources are queried concurrently; each gets this long (seconds)
+# before it is left out of the answer. The pool is shared by every chat
+# request, so a source runs only when one of RETRIEVAL_WORKERS slots is
+# free — a source that timed out keeps its slot until it really returns.
+# A request waits at most RETRIEVAL_QUEUE_SECONDS for slots; sources that
+# get none are left out too, so retrieval time stays bounded under load.
+RETRIEVAL_WORKERS = int(os.getenv("RETRIEVAL_WORKERS", "8"))
+RETRIEVAL_TIMEOUT_SECONDS = float(os.getenv("RETRIEVAL_TIMEOUT_SECONDS", "3"))
+PDF_RETRIEVAL_TIMEOUT_SECONDS = float(os.getenv("PDF_RETRIEVAL_TIMEOUT_SECONDS", "10"))
+RETRIEVAL_QUEUE_SECONDS = float(os.getenv("RETRIEVAL_QUEUE_SECONDS", "1"))
+
+_executor = None
+_executor_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, RETRIEVAL_WORKERS))
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, RETRIEVAL_WORKERS), thread_name_prefix="retrieval")
+    return _executor
+
+
 class InformationRetrievalAgent:
     """
     Retrieves relevant academic information from:
@@ -9,12 +40,12 @@ class InformationRetrievalAgent:
         self._pdf_processor = None
 
     def _get_pdf_processor(self):
-        """Load PDF processor only when needed (lazy loading)."""
+        """Load the shared PDF processor only when needed (lazy loading)."""
         if self._pdf_processor is None:
             try:
-                from utils.pdf_processor import PDFProcessor
+                from utils.embeddings import get_pdf_processor
 
-                self._pdf_processor = PDFProcessor()
+                self._pdf_processor = get_pdf_processor()
             except Exception as e:
                 print(f"PDF Processor not available: {e}")
         return self._pdf_processor
@@ -80,8 +111,8 @@ class InformationRetrievalAgent:
             print(f"PDF search error: {e}")
         return ""
 
-    def should_search_pdfs(self, query_analysis: dict, faq_count: int) -> bool:
-        """Avoid expensive PDF retrieval unless the question likely needs document context."""
+    def needs_pdf_context(self, query_analysis: dict) -> bool:
+        """Whether the question itself calls for document context (FAQ results aside)."""
         query = query_analysis.get("original_query", "").lower()
         category = query_analysis.get("category", "")
         doc_terms = [
@@ -99,12 +130,55 @@ class InformationRetrievalAgent:
         ]
         if any(term in query for term in doc_terms):
             return True
-        if faq_count == 0:
-            return True
         return category in {"general", "admission"}
 
+    def should_search_pdfs(self, query_analysis: dict, faq_count: int) -> bool:
+        """Avoid expensive PDF retrieval unless the question likely needs document context."""
+        return faq_count == 0 or self.needs_pdf_context(query_analysis)
+
+    def _fetch(self, sources: dict, retrieved_data: dict) -> None:
+        """
+        Run {key: (fn, args, timeout)} concurrently and store each result under its key.
+
+        A source that gets no worker slot within RETRIEVAL_QUEUE_SECONDS, or
+        misses its timeout once running, keeps its empty default and is
+        listed in retrieved_data["timed_out"]; the others are still used.
+        Holding a slot per task means a submitted task never waits in the
+        executor queue, so its timeout only covers its own run time.
+        """
+        executor = _get_executor()
+        queue_deadline = time.perf_counter() + RETRIEVAL_QUEUE_SECONDS
+        futures = {}
+        for key, (fn, args, timeout) in sources.items():
+            if not _slots.acquire(timeout=max(0.0, queue_deadline - time.perf_counter())):
+                retrieved_data["timed_out"].append(key)
+                print(f"Retrieval: no free worker for {key}, answering without it")
+                continue
+            try:
+                future = executor.submit(fn, *args)
+            except Exception:
+                _slots.release()
+                raise
+            future.add_done_callback(lambda _: _slots.release())
+            futures[key] = (future, time.perf_counter() + timeout, timeout)
+        for key, (future, deadline, timeout) in futures.items():
+            try:
+                retrieved_data[key] = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+            except FutureTimeoutError:
+                retrieved_data["timed_out"].append(key)
+                print(f"Retrieval: {key} timed out after {timeout:g}s, answering without it")
+            except Exception as e:
+                print(f"Retrieval: {key} failed: {e}")
+
     def retrieve(self, query_analysis: dict) -> dict:
-        """Fetch all relevant data for the given query."""
+        """
+        Fetch all relevant data for the given query.
+
+        FAQs, the exam schedule / fee structure (for those categories) and,
+        when the question asks for documents, PDF search are queried at the
+        same time, so retrieval takes as long as the slowest source rather
+        than their sum. PDFs are searched afterwards only if no FAQ matched.
+        """
         category = query_analysis["category"]
         original_query = query_analysis["original_query"]
 
@@ -114,25 +188,29 @@ class InformationRetrievalAgent:
             "fees": [],
             "pdf_context": "",
             "category": category,
+            "timed_out": [],
         }
 
-        retrieved_data["faqs"] = self.search_faqs(original_query, category)
-
+        sources = {"faqs": (self.search_faqs, (original_query, category), RETRIEVAL_TIMEOUT_SECONDS)}
         if category == "exam":
-            retrieved_data["exam_schedule"] = self.get_exam_schedule()
-
+            sources["exam_schedule"] = (self.get_exam_schedule, (), RETRIEVAL_TIMEOUT_SECONDS)
         if category == "fees":
-            retrieved_data["fees"] = self.get_fee_structure()
+            sources["fees"] = (self.get_fee_structure, (), RETRIEVAL_TIMEOUT_SECONDS)
+        pdf_requested = self.needs_pdf_context(query_analysis)
+        if pdf_requested:
+            sources["pdf_context"] = (self.search_pdfs, (original_query,), PDF_RETRIEVAL_TIMEOUT_SECONDS)
+        self._fetch(sources, retrieved_data)
 
-        pdf_results = self.search_pdfs(original_query) if self.should_search_pdfs(query_analysis, len(retrieved_data["faqs"])) else ""
-        if pdf_results:
-            retrieved_data["pdf_context"] = pdf_results
+        if not pdf_requested and self.should_search_pdfs(query_analysis, len(retrieved_data["faqs"])):
+            self._fetch({"pdf_context": (self.search_pdfs, (original_query,), PDF_RETRIEVAL_TIMEOUT_SECONDS)}, retrieved_data)
 
+        pdf_results = retrieved_data["pdf_context"]
         print(
             f"Retrieval Agent: {len(retrieved_data['faqs'])} FAQ(s) | "
             f"Exams: {'Yes' if retrieved_data['exam_schedule'] else 'No'} | "
             f"Fees: {'Yes' if retrieved_data['fees'] else 'No'} | "
             f"PDF: {'Yes' if pdf_results else 'No'}"
+            + (f" | Timed out: {', '.join(retrieved_data['timed_out'])}" if retrieved_data["timed_out"] else "")
         )
 
         return retrieved_data
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+
+from utils.embeddings import embed_query, get_embeddings
+
+
+class SemanticAnswerCache:
+    """
+    Reuses a previously generated answer for a paraphrased question.
+
+    The exact-match cache in utils/answer_cache.py only helps when
+    students type the same words. Here every answered question is stored
+    as a normalized embedding vector (same shared all-MiniLM-L6-v2 model
+    as PDF search, see utils/embeddings.py); a new question is embedded and
+    compared (cosine similarity = dot product of normalized vectors)
+    against all stored ones in a single matrix multiplication. If the
+    best match is at least SEMANTIC_CACHE_THRESHOLD similar, belongs to
+    the same query category and was built from the current data version,
+    its answer is returned and retrieval + LLM generation are skipped.
+
+    Example:
+        "What is the last date for fees?"  ≈  "fee deadline?"   → reuse
+        "exam fee amount"                  ≠  "exam date"       → category/threshold stop it
+    """
+
+    def __init__(self):
+        self.threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+        self.max_entries = int(os.getenv("SEMANTIC_CACHE_SIZE", "256"))
+        self.ttl_seconds = float(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", "600"))
+        self.enabled = os.getenv("SEMANTIC_CACHE_ENABLED", "true").strip().lower() in {"1", "true", "yes", "on"}
+
+        self._embeddings = None
+        self._lock = threading.Lock()
+        self._vectors = None      # (max_entries, dim) float32 matrix, allocated on first store
+        self._entries = []        # slot -> {"category", "data_version", "created_at", "payload"}
+        self._next_slot = 0       # oldest slot is overwritten once the matrix is full
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def _get_embeddings(self):
+        """Shared embedding model (disables the cache if unavailable)."""
+        if self._embeddings is None and self.enabled:
+            try:
+                self._embeddings = get_embeddings()
+            except Exception as e:
+                print(f"⚠️  Semantic cache disabled — embedding model unavailable: {e}")
+                self.enabled = False
+        return self._embeddings
+
+    def embed(self, query: str):
+        """Return the normalized query vector, or None when the cache is disabled."""
+        embeddings = self._get_embeddings()
+        if embeddings is None:
+            return None
+        import numpy as np
+
+        try:
+            return np.asarray(embed_query(query), dtype=np.float32)
+        except Exception as e:
+            print(f"⚠️  Semantic cache embedding error: {e}")
+            return None
+
+    def lookup(self, query_vector, category: str, data_version: int):
+        """
+        Find the closest cached answer for this question.
+
+        Returns:
+            (payload, similarity) on a hit, (None, best_similarity) on a miss
+        """
+        if query_vector is None:
+            return None, 0.0
+        import numpy as np
+
+        with self._lock:
+            count = len(self._entries)
+            if count == 0:
+                self.misses += 1
+                return None, 0.0
+
+            similarities = self._vectors[:count] @ query_vector
+            now = time.monotonic()
+            for slot, entry in enumerate(self._entries):
+                if (
+                    entry["category"] != category
+                    or entry["data_version"] != data_version
+                    or now - entry["created_at"] > self.ttl_seconds
+                ):
+                    similarities[slot] = -1.0
+
+            best = int(np.argmax(similarities))
+            best_similarity = float(similarities[best])
+            if best_similarity >= self.threshold:
+                self.hits += 1
+                return self._entries[best]["payload"], best_similarity
+
+            self.misses += 1
+            return None, max(best_similarity, 0.0)
+
+    def store(self, query_vector, category: str, data_version: int, payload: dict) -> None:
+        """Remember an answer so paraphrases of this question can reuse it."""
+        if query_vector is None or self.max_entries <= 0:
+            return
+        import numpy as np
+
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_entries, query_vector.shape[0]), dtype=np.float32)
+
+            entry = {
+                "category": category,
+                "data_version": data_version,
+                "created_at": time.monotonic(),
+                "payload": payload,
+            }
+            slot = self._next_slot
+            self._vectors[slot] = query_vector
+            if slot < len(self._entries):
+                self._entries[slot] = entry
+            else:
+                self._entries.append(entry)
+            self._next_slot = (slot + 1) % self.max_entries
+            self.stores += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "stores": self.stores,
+        }
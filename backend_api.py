@@ -1,20 +1,23 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
 import os
-import secrets
+import threading
 from pathlib import Path
 from datetime import datetime
-from datetime import timedelta
 from io import BytesIO
 import re
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Optional
 from uuid import uuid4
 
 from fastapi import Depends, FastAPI, File, Form, Header, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 
+from database.indexes import ensure_indexes, index_report
 from database.mongo_db import (
     add_or_update_fee_ledger,
     add_exam,
@@ -35,12 +38,19 @@ from database.mongo_db import (
     get_all_uploaded_pdfs,
     get_admin_audit_logs,
     get_database,
+    get_data_version,
+    get_data_versions,
     get_fee_ledger,
+    get_pdf_index_refs,
+    load_faq_index,
+    faq_counters,
+    FAQ_SEARCH_MODE,
     get_escalated_queries,
     get_student_reminders,
     get_student_by_identifier_credentials,
     get_student_by_id,
     get_uploaded_pdf_by_id,
+    find_uploaded_pdf_by_hash,
     log_admin_action,
     get_statistics,
     increment_faq_view,
@@ -56,9 +66,18 @@ from database.mongo_db import (
     update_student,
     verify_admin_credentials,
 )
+from agents.response_agent import FallbackText, is_fallback_message
 from start_llm import initialize_llm
-from utils.student_importer import parse_student_file
-from utils.pdf_processor import PDFProcessor
+from utils.student_importer import import_students, parse_student_file
+from utils.signed_tokens import AUTH_TOKEN_MODE, open_auth_tokens
+from utils.answer_cache import answer_cache
+from utils.faq_index import faq_index
+from utils.llm_gate import LLMBusyError, llm_gate
+from utils.ollama_client import aclose_clients
+from utils.embeddings import get_pdf_processor, registry_stats, warm_up
+from utils.ingestion_queue import ingestion_queue
+from utils.pdf_text import shutdown_pool as shutdown_pdf_text_pool
+from utils.password_pool import PasswordPoolBusy, password_verifier, shutdown_pool as shutdown_password_pool
 
 app = FastAPI(title="EduAgent API", version="1.0.0")
 
@@ -79,11 +98,12 @@ ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin123")
 UPLOAD_DIR = "uploaded_pdfs"
 TOKEN_TTL_HOURS = 8
 DEMO_SEED_ENABLED = os.getenv("ENABLE_DEMO_SEED", "false").strip().lower() in {"1", "true", "yes", "on"}
+EMBEDDINGS_WARMUP = os.getenv("EMBEDDINGS_WARMUP", "true").strip().lower() in {"1", "true", "yes", "on"}
 
 _cached_llm_status: Optional[Dict[str, Any]] = None
 _cached_agents: Optional[Dict[str, Any]] = None
-_admin_tokens: Dict[str, Dict[str, str]] = {}
-_student_tokens: Dict[str, Dict[str, str]] = {}
+_admin_tokens = open_auth_tokens("admin", "admin_id")
+_student_tokens = open_auth_tokens("student", "student_id")
 
 
 class ChatRequest(BaseModel):
@@ -159,40 +179,8 @@ class StudentCreate(BaseModel):
     password: str
 
 
-def _cleanup_tokens() -> None:
-    now = datetime.now()
-    expired = []
-    for token, data in _admin_tokens.items():
-        expires_at = data.get("expires_at", "")
-        try:
-            exp_dt = datetime.fromisoformat(expires_at)
-        except ValueError:
-            exp_dt = now
-        if exp_dt < now:
-            expired.append(token)
-    for token in expired:
-        _admin_tokens.pop(token, None)
-
-    student_expired = []
-    for token, data in _student_tokens.items():
-        expires_at = data.get("expires_at", "")
-        try:
-            exp_dt = datetime.fromisoformat(expires_at)
-        except ValueError:
-            exp_dt = now
-        if exp_dt < now:
-            student_expired.append(token)
-    for token in student_expired:
-        _student_tokens.pop(token, None)
-
-
 def _issue_admin_token(admin_id: str = "admin") -> Dict[str, Any]:
-    token = secrets.token_urlsafe(32)
-    expires_at = datetime.now() + timedelta(hours=TOKEN_TTL_HOURS)
-    _admin_tokens[token] = {
-        "admin_id": admin_id,
-        "expires_at": expires_at.isoformat(),
-    }
+    token, expires_at = _admin_tokens.issue({"admin_id": admin_id}, TOKEN_TTL_HOURS * 3600)
     return {
         "token": token,
         "expires_at": expires_at.isoformat(),
@@ -202,13 +190,7 @@ def _issue_admin_token(admin_id: str = "admin") -> Dict[str, Any]:
 
 
 def _issue_student_token(student_id: str, name: str) -> Dict[str, Any]:
-    token = secrets.token_urlsafe(32)
-    expires_at = datetime.now() + timedelta(hours=TOKEN_TTL_HOURS)
-    _student_tokens[token] = {
-        "student_id": student_id,
-        "name": name,
-        "expires_at": expires_at.isoformat(),
-    }
+    token, expires_at = _student_tokens.issue({"student_id": student_id, "name": name}, TOKEN_TTL_HOURS * 3600)
     return {
         "token": token,
         "expires_at": expires_at.isoformat(),
@@ -387,8 +369,6 @@ def _seed_demo_data() -> None:
 def require_admin(
     authorization: str = Header(default=""),
 ) -> Dict[str, str]:
-    _cleanup_tokens()
-
     if authorization.startswith("Bearer "):
         token = authorization.replace("Bearer ", "", 1).strip()
         admin_auth = _admin_tokens.get(token)
@@ -399,7 +379,6 @@ def require_admin(
 
 
 def require_student(authorization: str = Header(default="")) -> Dict[str, str]:
-    _cleanup_tokens()
     if not authorization.startswith("Bearer "):
         raise HTTPException(status_code=403, detail="Unauthorized student access")
     token = authorization.replace("Bearer ", "", 1).strip()
@@ -427,8 +406,23 @@ def _audit(
 
 @app.on_event("startup")
 def on_startup() -> None:
+    ensure_indexes()
     _seed_demo_data()
     ensure_admin_account(ADMIN_PASSWORD)
+    if FAQ_SEARCH_MODE != "text":
+        load_faq_index()
+    if EMBEDDINGS_WARMUP:
+        # Load the embedding model in the background so the first PDF search/upload doesn't pay for it.
+        threading.Thread(target=warm_up, name="embeddings-warmup", daemon=True).start()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    ingestion_queue.shutdown()
+    shutdown_pdf_text_pool()
+    shutdown_password_pool()
+    faq_counters.stop()
+    await aclose_clients()
 
 
 def get_llm_status() -> Dict[str, Any]:
@@ -445,12 +439,14 @@ def get_agents() -> Dict[str, Any]:
         from agents.query_agent import QueryUnderstandingAgent
         from agents.response_agent import ResponseGenerationAgent
         from agents.retrieval_agent import InformationRetrievalAgent
+        from agents.semantic_cache import SemanticAnswerCache
 
         _cached_agents = {
             "query": QueryUnderstandingAgent(),
             "retrieval": InformationRetrievalAgent(),
             "response": ResponseGenerationAgent(),
             "escalation": EscalationAgent(),
+            "semantic_cache": SemanticAnswerCache(),
         }
     return _cached_agents
 
@@ -513,21 +509,38 @@ def health() -> Dict[str, Any]:
     return {
         "ok": True,
         "time": datetime.now().isoformat(),
+        "llm_queue_depth": llm_gate.waiting,
     }
 
 
-@app.post("/api/chat")
-def chat(req: ChatRequest) -> Dict[str, Any]:
-    prompt = req.message.strip()
-    if not prompt:
-        raise HTTPException(status_code=400, detail="Message cannot be empty")
+def _generation_meta(query_analysis: Dict[str, Any], retrieved_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "category": query_analysis.get("category"),
+        "faq_count": len(retrieved_data.get("faqs", [])),
+        "faq_ids": [f.get("_id") for f in retrieved_data.get("faqs", []) if f.get("_id")],
+        "has_pdf": bool(retrieved_data.get("pdf_context")),
+        "downloads": [],
+        "timed_out": list(retrieved_data.get("timed_out", [])),
+    }
 
+
+def _prepare_chat(prompt: str) -> Dict[str, Any]:
+    """
+    Run every chat step that comes before LLM generation.
+
+    Returns {"response": payload} when the answer is already known
+    (LLM offline, escalation, direct download, cached answer, FAQ fast
+    path), otherwise {"query_analysis": ..., "retrieved_data": ...,
+    "cache_key": ..., "query_vector": ...} for the response agent.
+    """
     llm_status = get_llm_status()
     if not llm_status.get("ready"):
         return {
-            "answer": "The local AI model is not ready. Please run `ollama serve` and try again.",
-            "escalated": False,
-            "meta": {"llm_ready": False},
+            "response": {
+                "answer": "The local AI model is not ready. Please run `ollama serve` and try again.",
+                "escalated": False,
+                "meta": {"llm_ready": False},
+            }
         }
 
     agents = get_agents()
@@ -535,9 +548,11 @@ def chat(req: ChatRequest) -> Dict[str, Any]:
     escalation_result = agents["escalation"].process(prompt)
     if escalation_result.get("escalated"):
         return {
-            "answer": escalation_result.get("message", "Your query has been escalated."),
-            "escalated": True,
-            "meta": {"reason": escalation_result.get("reason", "")},
+            "response": {
+                "answer": escalation_result.get("message", "Your query has been escalated."),
+                "escalated": True,
+                "meta": {"reason": escalation_result.get("reason", "")},
+            }
         }
 
     # If the student is explicitly asking for downloadable files, prioritize direct file links.
@@ -554,53 +569,197 @@ def chat(req: ChatRequest) -> Dict[str, Any]:
             ]
             names = "\n".join([f"- {d['name']}" for d in downloads])
             return {
-                "answer": (
-                    "I found matching document(s). You can download them directly:\n\n"
-                    f"{names}"
-                ),
-                "escalated": False,
-                "meta": {
-                    "category": "documents",
-                    "faq_count": 0,
-                    "faq_ids": [],
-                    "has_pdf": True,
-                    "downloads": downloads,
-                },
+                "response": {
+                    "answer": (
+                        "I found matching document(s). You can download them directly:\n\n"
+                        f"{names}"
+                    ),
+                    "escalated": False,
+                    "meta": {
+                        "category": "documents",
+                        "faq_count": 0,
+                        "faq_ids": [],
+                        "has_pdf": True,
+                        "downloads": downloads,
+                    },
+                }
             }
 
+    # Escalation and downloads run first on purpose: they have side effects
+    # (saving the escalation, picking current files) that must not be cached.
+    cache_key = answer_cache.make_key(prompt, get_data_version())
+    cached = answer_cache.get(cache_key)
+    if cached is not None:
+        return {"response": {**cached, "meta": {**cached["meta"], "cached": True}}}
+
     query_analysis = agents["query"].analyze(prompt)
+
+    # Paraphrase of a question answered recently? Reuse it and skip retrieval + LLM.
+    query_vector = agents["semantic_cache"].embed(prompt)
+    similar, similarity = agents["semantic_cache"].lookup(query_vector, query_analysis.get("category"), cache_key[1])
+    if similar is not None:
+        answer_cache.put(cache_key, similar)
+        return {"response": {**similar, "meta": {**similar["meta"], "cached": True, "similarity": round(similarity, 3)}}}
+
     retrieved_data = agents["retrieval"].retrieve(query_analysis)
+    prepared = {
+        "query_analysis": query_analysis,
+        "retrieved_data": retrieved_data,
+        "cache_key": cache_key,
+        "query_vector": query_vector,
+    }
 
-    if retrieved_data.get("faqs") and not retrieved_data.get("exam_schedule") and not retrieved_data.get("fees") and not retrieved_data.get("pdf_context"):
+    # Only FAQs because the other sources timed out is not a confident FAQ match: let the LLM answer
+    if (
+        retrieved_data.get("faqs")
+        and not retrieved_data.get("timed_out")
+        and not retrieved_data.get("exam_schedule")
+        and not retrieved_data.get("fees")
+        and not retrieved_data.get("pdf_context")
+    ):
         top_faq = retrieved_data["faqs"][0]
         answer = (top_faq.get("answer") or "").strip()
         if answer and "Is there anything else I can help you with?" not in answer:
             answer = f"{answer}\n\nIs there anything else I can help you with?"
-        return {
+        payload = {
             "answer": answer or "I found a matching FAQ but could not format the response.",
             "escalated": False,
-            "meta": {
-                "category": query_analysis.get("category"),
-                "faq_count": len(retrieved_data.get("faqs", [])),
-                "faq_ids": [f.get("_id") for f in retrieved_data.get("faqs", []) if f.get("_id")],
-                "has_pdf": False,
-                "downloads": [],
-                "fast_path": True,
-            },
+            "meta": {**_generation_meta(query_analysis, retrieved_data), "fast_path": True},
         }
+        if answer:
+            _remember_answer(prepared, payload)
+        return {"response": payload}
 
-    answer = agents["response"].generate(prompt, retrieved_data)
+    return prepared
 
-    return {
+
+def _remember_answer(prepared: Dict[str, Any], payload: Dict[str, Any]) -> None:
+    """Store a good answer in the exact-match and semantic caches."""
+    if is_fallback_message(payload["answer"]):
+        return
+    if payload.get("meta", {}).get("timed_out"):
+        # Built from partial retrieval; let the next asker get a complete answer
+        return
+    answer_cache.put(prepared["cache_key"], payload)
+    get_agents()["semantic_cache"].store(
+        prepared["query_vector"],
+        prepared["query_analysis"].get("category"),
+        prepared["cache_key"][1],
+        payload,
+    )
+
+
+def _sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _llm_busy_exception(exc: LLMBusyError) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"})
+
+
+def _login_busy_exception(exc: PasswordPoolBusy) -> HTTPException:
+    return HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "2"})
+
+
+@app.post("/api/chat")
+async def chat(req: ChatRequest) -> Dict[str, Any]:
+    prompt = req.message.strip()
+    if not prompt:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+
+    # Retrieval is Mongo + embedding work on blocking clients; keep it off the event loop.
+    prepared = await asyncio.to_thread(_prepare_chat, prompt)
+    if "response" in prepared:
+        return prepared["response"]
+
+    try:
+        async with llm_gate.slot():
+            answer = await get_agents()["response"].agenerate(prompt, prepared["retrieved_data"])
+    except LLMBusyError as exc:
+        raise _llm_busy_exception(exc) from exc
+
+    payload = {
         "answer": answer,
         "escalated": False,
-        "meta": {
-            "category": query_analysis.get("category"),
-            "faq_count": len(retrieved_data.get("faqs", [])),
-            "faq_ids": [f.get("_id") for f in retrieved_data.get("faqs", []) if f.get("_id")],
-            "has_pdf": bool(retrieved_data.get("pdf_context")),
-            "downloads": [],
-        },
+        "meta": _generation_meta(prepared["query_analysis"], prepared["retrieved_data"]),
+    }
+    _remember_answer(prepared, payload)
+    return payload
+
+
+@app.post("/api/chat/stream")
+async def chat_stream(req: ChatRequest) -> StreamingResponse:
+    """
+    Server-Sent Events variant of /api/chat.
+
+    Emits one "meta" event, then "token" events as the model produces
+    text, then a "done" event carrying the full answer (same shape as the
+    /api/chat response). Answers that need no LLM are sent as meta + done.
+    If the LLM queue fills up after the stream has started, an "error"
+    event is sent instead of tokens.
+    """
+    prompt = req.message.strip()
+    if not prompt:
+        raise HTTPException(status_code=400, detail="Message cannot be empty")
+
+    prepared = await asyncio.to_thread(_prepare_chat, prompt)
+    if "response" not in prepared and llm_gate.is_saturated():
+        raise _llm_busy_exception(LLMBusyError("The AI is busy answering other students. Please retry shortly."))
+
+    async def events() -> AsyncIterator[str]:
+        if "response" in prepared:
+            payload = prepared["response"]
+            yield _sse_event("meta", {"escalated": payload["escalated"], "meta": payload["meta"]})
+            yield _sse_event("done", payload)
+            return
+
+        meta = _generation_meta(prepared["query_analysis"], prepared["retrieved_data"])
+        yield _sse_event("meta", {"escalated": False, "meta": meta})
+
+        parts: list[str] = []
+        failed = False
+        try:
+            async with llm_gate.slot():
+                async for text in get_agents()["response"].agenerate_stream(prompt, prepared["retrieved_data"]):
+                    # An error can follow partial text; the joined answer must not be cached then
+                    failed = failed or isinstance(text, FallbackText)
+                    parts.append(text)
+                    yield _sse_event("token", {"text": text})
+        except LLMBusyError as exc:
+            yield _sse_event("error", {"detail": str(exc), "retry_after": 5})
+            return
+
+        payload = {"answer": "".join(parts).strip(), "escalated": False, "meta": meta}
+        if not failed:
+            _remember_answer(prepared, payload)
+        yield _sse_event("done", payload)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/admin/db/indexes")
+def admin_db_indexes(_: Dict[str, str] = Depends(require_admin)) -> Dict[str, Any]:
+    # Re-running the bootstrap is cheap (existing indexes are no-ops) and reports failures
+    return {"bootstrap": ensure_indexes(), "queries": index_report()}
+
+
+@app.get("/api/admin/perf")
+def admin_perf(_: Dict[str, str] = Depends(require_admin)) -> Dict[str, Any]:
+    return {
+        "llm_gate": llm_gate.stats(),
+        "answer_cache": answer_cache.stats(),
+        "faq_index": faq_index.stats(),
+        "faq_counters": faq_counters.stats(),
+        "semantic_cache": get_agents()["semantic_cache"].stats(),
+        "data_versions": get_data_versions(),
+        "embeddings": registry_stats(),
+        "pdf_ingestion": ingestion_queue.stats(),
+        "password_verify": password_verifier.stats(),
+        "sessions": {"admin": _admin_tokens.stats(), "student": _student_tokens.stats()},
     }
 
 
@@ -623,7 +782,11 @@ def download_uploaded_pdf(pdf_id: str) -> FileResponse:
 
 @app.post("/api/admin/login")
 def admin_login(payload: AdminLoginRequest) -> Dict[str, Any]:
-    if not verify_admin_credentials(payload.password):
+    try:
+        verified = verify_admin_credentials(payload.password)
+    except PasswordPoolBusy as exc:
+        raise _login_busy_exception(exc) from exc
+    if not verified:
         log_admin_action("admin", "admin.login.failed", "auth", "admin", {"success": False})
         raise HTTPException(status_code=403, detail="Invalid admin password")
 
@@ -632,6 +795,13 @@ def admin_login(payload: AdminLoginRequest) -> Dict[str, Any]:
     return {"ok": True, **token_data}
 
 
+@app.post("/api/admin/logout")
+def admin_logout(admin_auth: Dict[str, str] = Depends(require_admin)) -> Dict[str, Any]:
+    _admin_tokens.remove(admin_auth["token"])
+    _audit(admin_auth, "admin.logout", "auth", admin_auth.get("admin_id", "admin"))
+    return {"ok": True}
+
+
 @app.post("/api/student/login")
 def student_login(payload: StudentLoginRequest) -> Dict[str, Any]:
     identifier = (payload.identifier or payload.student_id).strip()
@@ -639,7 +809,10 @@ def student_login(payload: StudentLoginRequest) -> Dict[str, Any]:
     if not identifier or not password:
         raise HTTPException(status_code=400, detail="Enrollment number/Student ID and password are required")
 
-    student = get_student_by_identifier_credentials(identifier, password)
+    try:
+        student = get_student_by_identifier_credentials(identifier, password)
+    except PasswordPoolBusy as exc:
+        raise _login_busy_exception(exc) from exc
     if not student:
         raise HTTPException(status_code=403, detail="Invalid student credentials")
 
@@ -647,6 +820,13 @@ def student_login(payload: StudentLoginRequest) -> Dict[str, Any]:
     return {"ok": True, **token_data}
 
 
+@app.post("/api/student/logout")
+def student_logout(authorization: str = Header(default="")) -> Dict[str, Any]:
+    if authorization.startswith("Bearer "):
+        _student_tokens.remove(authorization.replace("Bearer ", "", 1).strip())
+    return {"ok": True}
+
+
 @app.post("/api/student/change-password")
 def student_change_password(payload: StudentPasswordChangeRequest, student_auth: Dict[str, str] = Depends(require_student)) -> Dict[str, Any]:
     current_password = payload.current_password.strip()
@@ -658,13 +838,20 @@ def student_change_password(payload: StudentPasswordChangeRequest, student_auth:
     if current_password == new_password:
         raise HTTPException(status_code=400, detail="New password must be different from current password")
 
-    verified = get_student_by_identifier_credentials(student_auth["student_id"], current_password)
+    try:
+        verified = get_student_by_identifier_credentials(student_auth["student_id"], current_password)
+    except PasswordPoolBusy as exc:
+        raise _login_busy_exception(exc) from exc
     if not verified:
         raise HTTPException(status_code=403, detail="Current password is incorrect")
 
     ok = update_student_password(student_auth["student_id"], new_password)
     if not ok:
         raise HTTPException(status_code=500, detail="Failed to update password")
+    if AUTH_TOKEN_MODE == "signed":
+        # Sign out every device, this one included, then hand the caller a fresh token
+        _student_tokens.revoke_subject(student_auth["student_id"])
+        return {"ok": True, **_issue_student_token(student_auth["student_id"], student_auth.get("name", "Student"))}
     return {"ok": True}
 
 
@@ -863,26 +1050,22 @@ async def admin_import_students(
         if not clear_all_students():
             raise HTTPException(status_code=500, detail="Failed to clear existing students before import")
 
-    imported = 0
-    for student in students:
-        ok = add_student(
-            student["student_id"],
-            student["full_name"],
-            student["password"],
-            student.get("program", ""),
-            student["enrollment_no"],
-            int(student.get("semester", 0) or 0),
-        )
-        if ok:
-            imported += 1
+    # Hashing and bulk writes are CPU/IO heavy; keep them off the event loop
+    outcome = await asyncio.to_thread(import_students, students)
 
     result = {
         "ok": True,
-        "imported_count": imported,
+        "imported_count": outcome["imported_count"],
+        "failed_count": outcome["failed_count"],
         "skipped_count": summary.get("skipped_count", 0),
         "programs": summary.get("programs", {}),
         "source_file": summary.get("source_file", filename),
         "replace_existing": replace_existing,
+        "elapsed_seconds": outcome["elapsed_seconds"],
+        "rows_per_second": outcome["rows_per_second"],
+        "batch_errors": [
+            {"batch": batch["batch"], "errors": batch["errors"]} for batch in outcome["batches"] if batch["errors"]
+        ],
     }
     _audit(admin_auth, "student.import", "student", "", result)
     return result
@@ -914,6 +1097,9 @@ def admin_update_student(student_id: str, payload: StudentCreate, admin_auth: Di
     )
     if not ok:
         raise HTTPException(status_code=500, detail="Failed to update student")
+    if payload.password.strip() and AUTH_TOKEN_MODE == "signed":
+        # A reset password signs the student out everywhere; tokens carry the id they logged in with
+        _student_tokens.revoke_subject(student_id.strip())
     _audit(admin_auth, "student.update", "student", student_id, {"next_student_id": canonical_student_id})
     return {"ok": True}
 
@@ -977,7 +1163,6 @@ def student_documents(_: Dict[str, str] = Depends(require_student)) -> Dict[str,
 
 @app.get("/api/student/documents/{pdf_id}/download")
 def student_download_document(pdf_id: str, token: str = "", authorization: str = Header(default="")) -> FileResponse:
-    _cleanup_tokens()
     student_auth: Optional[Dict[str, str]] = None
     if authorization.startswith("Bearer "):
         student_auth = _student_tokens.get(authorization.replace("Bearer ", "", 1).strip())
@@ -1000,47 +1185,108 @@ def student_download_document(pdf_id: str, token: str = "", authorization: str =
     return FileResponse(filepath, media_type="application/pdf", filename=download_name)
 
 
-@app.post("/api/admin/pdfs")
+@app.post("/api/admin/pdfs", status_code=202)
 async def admin_upload_pdf(file: UploadFile = File(...), admin_auth: Dict[str, str] = Depends(require_admin)) -> Dict[str, Any]:
     original_name = (file.filename or "").strip()
     if not original_name.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
+    content = await file.read()
+
+    # Same bytes as an existing or in-flight upload (e.g. a renamed timetable): nothing to ingest.
+    # Mongo and disk calls go to a thread so open chat streams keep flowing.
+    content_hash = hashlib.sha256(content).hexdigest()
+    existing = await asyncio.to_thread(find_uploaded_pdf_by_hash, content_hash)
+    if existing:
+        await asyncio.to_thread(
+            _audit, admin_auth, "pdf.upload.duplicate", "pdf", existing["filename"], {"original_name": original_name}
+        )
+        return {"ok": True, "duplicate": True, "status": "duplicate", "job_id": "", "pdf": existing}
+    active = ingestion_queue.find_active(content_hash)
+    if active:
+        return {"ok": True, "duplicate": True, "status": active["status"], "job_id": active["id"], "job": active}
+
     os.makedirs(UPLOAD_DIR, exist_ok=True)
     safe_stem = re.sub(r"[^A-Za-z0-9._-]", "_", Path(original_name).stem).strip("._") or "document"
     stored_filename = f"{safe_stem}_{uuid4().hex[:8]}.pdf"
     save_path = os.path.join(UPLOAD_DIR, stored_filename)
 
-    content = await file.read()
-    with open(save_path, "wb") as f:
-        f.write(content)
-
-    result = PDFProcessor().process_pdf(save_path, original_name)
-    if not result.get("success"):
+    await asyncio.to_thread(Path(save_path).write_bytes, content)
+
+    def on_success(job: Dict[str, Any], result: Dict[str, Any]) -> None:
+        if not record_uploaded_pdf(
+            stored_filename,
+            result["pages"],
+            result["chunks"],
+            original_name=original_name,
+            content_hash=content_hash,
+            chunk_ids=result.get("chunk_ids"),
+        ):
+            raise RuntimeError("failed to save the PDF record")
+        _audit(admin_auth, "pdf.upload", "pdf", stored_filename, {"original_name": original_name, "job_id": job["id"]})
+
+    def on_failure(job: Dict[str, Any], error: str) -> None:
         if os.path.exists(save_path):
             os.remove(save_path)
-        raise HTTPException(status_code=500, detail=result.get("error", "PDF processing failed"))
-
-    record_uploaded_pdf(stored_filename, result["pages"], result["chunks"], original_name=original_name)
-    _audit(admin_auth, "pdf.upload", "pdf", stored_filename, {"original_name": original_name})
+        _audit(admin_auth, "pdf.upload.failed", "pdf", stored_filename, {"original_name": original_name, "error": error})
 
+    # Parsing + embedding runs in the background; poll /api/admin/pdfs/jobs/{job_id} for progress.
+    job = ingestion_queue.submit(save_path, stored_filename, original_name, on_success, on_failure, content_hash=content_hash)
     return {
         "ok": True,
-        "pages": result["pages"],
-        "chunks": result["chunks"],
+        "duplicate": False,
+        "job_id": job["id"],
+        "status": job["status"],
+        "job": job,
     }
 
 
+@app.get("/api/admin/pdfs/jobs")
+def admin_pdf_jobs(limit: int = 50, _: Dict[str, str] = Depends(require_admin)) -> Dict[str, Any]:
+    return {"items": ingestion_queue.list_jobs(max(1, min(limit, 200)))}
+
+
+@app.get("/api/admin/pdfs/jobs/{job_id}")
+def admin_pdf_job(job_id: str, _: Dict[str, str] = Depends(require_admin)) -> Dict[str, Any]:
+    job = ingestion_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job
+
+
 @app.delete("/api/admin/pdfs/{pdf_id}")
 def admin_delete_pdf(pdf_id: str, filename: str = "", admin_auth: Dict[str, str] = Depends(require_admin)) -> Dict[str, Any]:
+    doc = get_uploaded_pdf_by_id(pdf_id)
     ok = delete_uploaded_pdf_record(pdf_id)
     if not ok:
         raise HTTPException(status_code=500, detail="Failed to delete PDF record")
 
+    chunks_removed = 0
+    if doc:
+        filename = doc.get("filename") or filename
+        try:
+            chunks_removed = get_pdf_processor().remove_document(doc)
+        except Exception as exc:
+            # The record is gone either way; leftover chunks are dropped by the next compaction.
+            print(f"Warning: could not remove PDF chunks from the vector store: {exc}")
+
     if filename:
         fp = os.path.join(UPLOAD_DIR, filename)
         if os.path.exists(fp):
             os.remove(fp)
 
-    _audit(admin_auth, "pdf.delete", "pdf", pdf_id, {"filename": filename})
-    return {"ok": True}
+    _audit(admin_auth, "pdf.delete", "pdf", pdf_id, {"filename": filename, "chunks_removed": chunks_removed})
+    return {"ok": True, "chunks_removed": chunks_removed}
+
+
+@app.post("/api/admin/pdfs/compact")
+def admin_compact_pdfs(admin_auth: Dict[str, str] = Depends(require_admin)) -> Dict[str, Any]:
+    # A running job stores its chunks before its record exists; compacting now would drop them.
+    queue = ingestion_queue.stats()
+    if queue["queued"] or queue["running"]:
+        raise HTTPException(status_code=409, detail="PDF ingestion in progress, try again when it finishes")
+
+    live_ids, legacy_names, tracked_names = get_pdf_index_refs()
+    result = get_pdf_processor().compact(live_ids, legacy_names, tracked_names)
+    _audit(admin_auth, "pdf.compact", "pdf", "vector_db", result)
+    return {"ok": True, **result}
@@ -0,0 +1,154 @@
+"""
+database/indexes.py
+====================
+Index bootstrap for every MongoDB collection the app queries.
+
+ensure_indexes() creates (idempotently — create_index is a no-op when
+an identical index exists) one index per hot query in INDEX_SPECS and
+is run from the API's on_startup. A spec that cannot be built, e.g. a
+unique index over data that already has duplicates, is reported and
+skipped; the app keeps working, just without that index.
+
+index_report() runs explain() on each query shape in QUERY_SHAPES and
+says which index serves it, or COLLSCAN when none does:
+
+    python -m database.indexes
+"""
+
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.mongo_db import FAQ_TEXT_INDEX_NAME, FAQ_TEXT_WEIGHTS, get_database
+
+ASC = 1
+DESC = -1
+
+# collection, keys, create_index options
+INDEX_SPECS = [
+    # Logins and profile lookups; one record per student
+    ("students", [("student_id", ASC)], {"name": "student_id_unique", "unique": True}),
+    ("students", [("enrollment_no", ASC)], {"name": "enrollment_no"}),
+    ("admin_users", [("admin_id", ASC)], {"name": "admin_id_unique", "unique": True}),
+    # Ledger upserts by (student, fee type) and the due-date ordered listing
+    ("student_fee_ledger", [("student_id", ASC), ("fee_type", ASC)], {"name": "student_fee_type"}),
+    ("student_fee_ledger", [("due_date", ASC), ("student_id", ASC)], {"name": "due_date_student"}),
+    # A student's reminders, newest first, optionally unread only
+    ("fee_reminders", [("student_id", ASC), ("sent_at", DESC)], {"name": "student_sent_at"}),
+    ("fee_reminders", [("student_id", ASC), ("is_read", ASC), ("sent_at", DESC)], {"name": "student_unread_sent_at"}),
+    # Admin activity feeds, newest first
+    ("download_events", [("downloaded_at", DESC)], {"name": "downloaded_at"}),
+    ("download_events", [("student_id", ASC)], {"name": "student_id"}),
+    ("admin_audit_logs", [("created_at", DESC)], {"name": "created_at"}),
+    ("escalated_queries", [("timestamp", DESC)], {"name": "timestamp"}),
+    ("escalated_queries", [("status", ASC), ("timestamp", DESC)], {"name": "status_timestamp"}),
+    ("exam_schedules", [("exam_date", ASC)], {"name": "exam_date"}),
+    # PDF records: listing, duplicate check, re-upload, chunk reference lookups
+    ("uploaded_pdfs", [("uploaded_at", DESC)], {"name": "uploaded_at"}),
+    ("uploaded_pdfs", [("content_hash", ASC)], {"name": "content_hash"}),
+    ("uploaded_pdfs", [("filename", ASC)], {"name": "filename"}),
+    ("uploaded_pdfs", [("chunk_ids", ASC)], {"name": "chunk_ids"}),
+    # SESSION_BACKEND=mongo: token lookups are by _id; MongoDB deletes expired sessions
+    ("sessions", [("expires_at", ASC)], {"name": "expires_at_ttl", "expireAfterSeconds": 0}),
+    # FAQ_SEARCH_MODE=text
+    (
+        "faqs",
+        [(field, "text") for field in FAQ_TEXT_WEIGHTS],
+        {"name": FAQ_TEXT_INDEX_NAME, "weights": FAQ_TEXT_WEIGHTS, "default_language": "english"},
+    ),
+]
+
+# name, collection, filter, sort — the hot queries in database/mongo_db.py
+QUERY_SHAPES = [
+    ("student login", "students", {"$or": [{"student_id": "S1"}, {"enrollment_no": "S1"}]}, None),
+    ("student by id", "students", {"student_id": "S1"}, None),
+    ("students by enrollment", "students", {}, [("enrollment_no", ASC)]),
+    ("admin account", "admin_users", {"admin_id": "admin"}, None),
+    ("ledger row upsert", "student_fee_ledger", {"student_id": "S1", "fee_type": "Tuition"}, None),
+    ("ledger by due date", "student_fee_ledger", {}, [("due_date", ASC), ("student_id", ASC)]),
+    ("student ledger", "student_fee_ledger", {"student_id": "S1"}, [("due_date", ASC), ("student_id", ASC)]),
+    ("student reminders", "fee_reminders", {"student_id": "S1"}, [("sent_at", DESC)]),
+    ("unread reminders", "fee_reminders", {"student_id": "S1", "is_read": False}, [("sent_at", DESC)]),
+    ("download events", "download_events", {}, [("downloaded_at", DESC)]),
+    ("audit log", "admin_audit_logs", {}, [("created_at", DESC)]),
+    ("escalations", "escalated_queries", {}, [("timestamp", DESC)]),
+    ("escalations by status", "escalated_queries", {"status": "pending"}, [("timestamp", DESC)]),
+    ("exam schedule", "exam_schedules", {}, [("exam_date", ASC)]),
+    ("pdf list", "uploaded_pdfs", {}, [("uploaded_at", DESC)]),
+    ("pdf by hash", "uploaded_pdfs", {"content_hash": "x"}, None),
+    ("pdf by filename", "uploaded_pdfs", {"filename": "x.pdf"}, None),
+    ("pdf chunk refs", "uploaded_pdfs", {"chunk_ids": {"$in": ["x"]}}, None),
+    ("faq text search", "faqs", {"$text": {"$search": "fee deadline"}}, None),
+    ("faq regex fallback", "faqs", {"question": {"$regex": "fee", "$options": "i"}}, None),
+    ("fee structure", "fee_structure", {}, None),
+]
+
+
+def ensure_indexes() -> dict:
+    """
+    Create every index in INDEX_SPECS that does not exist yet.
+
+    Returns:
+        dict: {"created_or_present": [collection.name, ...], "failed": {collection.name: error}}
+    """
+    db = get_database()
+    ok, failed = [], {}
+    for collection, keys, options in INDEX_SPECS:
+        label = f"{collection}.{options['name']}"
+        try:
+            db[collection].create_index(keys, **options)
+            ok.append(label)
+        except Exception as e:
+            failed[label] = str(e)
+            print(f"⚠️  Could not create index {label}: {e}")
+    print(f"🗂️  MongoDB indexes ready: {len(ok)} ok, {len(failed)} failed")
+    return {"created_or_present": ok, "failed": failed}
+
+
+def _plan_indexes(stage: dict, found: set) -> None:
+    """Collect index names (or COLLSCAN) from an explain() winning plan tree."""
+    if stage.get("stage") == "COLLSCAN":
+        found.add("COLLSCAN")
+    if stage.get("indexName"):
+        found.add(stage["indexName"])
+    for child_key in ("inputStage", "queryPlan"):
+        if isinstance(stage.get(child_key), dict):
+            _plan_indexes(stage[child_key], found)
+    for child in stage.get("inputStages", []):
+        _plan_indexes(child, found)
+
+
+def index_report() -> list:
+    """
+    Which index each hot query shape uses.
+
+    Returns:
+        list of {"query", "collection", "indexes": [...], "indexed": bool}
+    """
+    db = get_database()
+    report = []
+    for name, collection, query, sort in QUERY_SHAPES:
+        entry = {"query": name, "collection": collection, "indexes": [], "indexed": False}
+        try:
+            cursor = db[collection].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+            found = set()
+            _plan_indexes(plan, found)
+            entry["indexes"] = sorted(found)
+            entry["indexed"] = bool(found) and "COLLSCAN" not in found
+        except Exception as e:
+            entry["error"] = str(e)
+        report.append(entry)
+    return report
+
+
+if __name__ == "__main__":
+    ensure_indexes()
+    for row in index_report():
+        status = "✅" if row["indexed"] else "❌"
+        detail = row.get("error") or ", ".join(row["indexes"]) or "-"
+        print(f"{status} {row['query']:<24} {row['collection']:<20} {detail}")
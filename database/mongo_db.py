@@ -3,9 +3,14 @@ import hashlib
 import hmac
 import os
 import secrets
+import threading
+import time
 from datetime import datetime
 from dotenv import load_dotenv
 
+from utils.counter_buffer import CounterBuffer
+from utils.faq_index import CATEGORY_BOOST, faq_index, in_category
+
 load_dotenv()
 
 # Global client variable — we reuse one connection instead of
@@ -13,6 +18,27 @@ load_dotenv()
 _client = None
 _db = None
 
+# Data versions — bumped by every write to FAQs, exams, fees or uploaded
+# PDFs so caches built on top of that data (utils/answer_cache.py) can
+# tell their entries are stale. Each bump is counted locally (seen at
+# once) and in the shared "meta" document (seen by every other API worker
+# and the admin panel within DATA_VERSION_POLL_SECONDS).
+_data_version = 0
+_data_versions = {"faqs": 0, "exams": 0, "fees": 0, "pdfs": 0}
+_data_version_lock = threading.Lock()
+DATA_VERSION_POLL_SECONDS = float(os.getenv("DATA_VERSION_POLL_SECONDS", "2"))
+DATA_VERSION_DOC_ID = "data_versions"
+_shared_version = 0
+_shared_version_checked = 0.0
+
+# FAQ search: "memory" = in-process BM25 index (utils/faq_index.py),
+# "text" = MongoDB text index, for deployments with many API workers
+FAQ_SEARCH_MODE = os.getenv("FAQ_SEARCH_MODE", "memory").strip().lower()
+
+# Weighted text index behind FAQ_SEARCH_MODE=text (created by database/indexes.py)
+FAQ_TEXT_INDEX_NAME = "faq_text"
+FAQ_TEXT_WEIGHTS = {"question": 10, "keywords": 8, "category": 3, "answer": 2}
+
 
 def _is_password_hash(value: str) -> bool:
     return isinstance(value, str) and value.startswith("pbkdf2_sha256$")
@@ -91,6 +117,54 @@ def get_database():
         raise
 
 
+def bump_data_version(source: str) -> None:
+    """Record that one source of chat context ("faqs", "exams", "fees", "pdfs") changed."""
+    global _data_version
+    with _data_version_lock:
+        _data_versions[source] = _data_versions.get(source, 0) + 1
+        _data_version += 1
+    try:
+        get_database().meta.update_one(
+            {"_id": DATA_VERSION_DOC_ID}, {"$inc": {source: 1, "version": 1}}, upsert=True
+        )
+    except Exception as e:
+        print(f"Error publishing data version: {e}")
+
+
+def _poll_shared_version() -> None:
+    """Re-read the shared version, at most every DATA_VERSION_POLL_SECONDS."""
+    global _shared_version, _shared_version_checked
+    now = time.monotonic()
+    with _data_version_lock:
+        if now - _shared_version_checked < DATA_VERSION_POLL_SECONDS:
+            return
+        _shared_version_checked = now
+    try:
+        doc = get_database().meta.find_one({"_id": DATA_VERSION_DOC_ID}) or {}
+    except Exception as e:
+        print(f"Error reading data version: {e}")
+        return
+    with _data_version_lock:
+        _shared_version = max(_shared_version, int(doc.get("version", 0)))
+
+
+def get_data_version() -> int:
+    """
+    Single monotonically increasing stamp covering all chat context data.
+
+    The sum of this process's own bumps (so its writes invalidate its
+    caches immediately) and the shared count of every process's bumps.
+    """
+    _poll_shared_version()
+    return _data_version + _shared_version
+
+
+def get_data_versions() -> dict:
+    """Per-source version counters, for diagnostics."""
+    with _data_version_lock:
+        return {"version": _data_version + _shared_version, "shared": _shared_version, **_data_versions}
+
+
 def close_connection():
     """Close the MongoDB connection cleanly."""
     global _client, _db
@@ -137,19 +211,110 @@ def get_all_faqs(category: str = None) -> list:
     return faqs
 
 
+def _faqs_for_index() -> list:
+    """Every FAQ with the fields the search index needs."""
+    db = get_database()
+    faqs = list(db.faqs.find({}, {"category": 1, "question": 1, "answer": 1, "keywords": 1,
+                                  "views": 1, "helpful_yes": 1, "helpful_total": 1}))
+    for faq in faqs:
+        faq.setdefault("views", 0)
+        faq.setdefault("helpful_yes", 0)
+        faq.setdefault("helpful_total", 0)
+        faq["_id"] = str(faq["_id"])
+    return faqs
+
+
+def load_faq_index() -> bool:
+    """(Re)load the in-memory FAQ search index from MongoDB."""
+    try:
+        faq_index.load(_faqs_for_index())
+        return True
+    except Exception as e:
+        faq_index.invalidate()
+        print(f"Error loading FAQ search index: {e}")
+        return False
+
+
+def _refresh_faq_search() -> None:
+    """After an FAQ write: the text index updates itself, the in-memory one is reloaded."""
+    if FAQ_SEARCH_MODE != "text":
+        load_faq_index()
+
+
 def search_faqs(query_text: str, category: str) -> list:
     """
-    Search FAQs by text matching in question, answer, keywords.
+    Find the FAQs that best answer a student's question.
 
-    Uses MongoDB's $or operator to search across multiple fields.
-    $regex does case-insensitive partial text matching.
+    Ranked with the in-memory BM25 index in utils/faq_index.py, or with
+    the MongoDB text index when FAQ_SEARCH_MODE=text; the MongoDB regex
+    query is only used if neither is available.
 
     Parameters:
         query_text (str): Text to search for
         category   (str): Category to prioritize in search
 
     Returns:
-        list of up to 3 matching FAQ dicts
+        list of up to 3 matching FAQ dicts, best match first
+    """
+    try:
+        if FAQ_SEARCH_MODE == "text":
+            results = _search_faqs_text(query_text, category, k=3)
+        else:
+            faq_index.ensure_loaded(_faqs_for_index)
+            results = faq_index.search(query_text, category, k=3)
+    except Exception as e:
+        print(f"FAQ index unavailable, searching MongoDB: {e}")
+        results = _search_faqs_mongo(query_text, category)
+
+    # Track FAQ impressions from student queries as "views" (buffered, see faq_counters)
+    for r in results:
+        faq_counters.add(r["_id"], "views")
+
+    return results
+
+
+def _search_faqs_text(query_text: str, category: str, k: int = 3) -> list:
+    """
+    Rank FAQs with the MongoDB text index ($text + textScore).
+
+    FAQs in the query's category get the same boost as in the in-memory
+    index; with no matching word the category's FAQs are returned.
+    """
+    db = get_database()
+    import re
+
+    # Quotes would turn the question into a phrase search
+    terms = query_text.replace('"', " ")
+    projection = {"score": {"$meta": "textScore"}}
+    candidates = list(
+        db.faqs.find({"$text": {"$search": terms}}, projection)
+        .sort([("score", {"$meta": "textScore"})])
+        .limit(max(k * 4, 10))
+    )
+    for faq in candidates:
+        if in_category(faq, category):
+            faq["score"] *= CATEGORY_BOOST
+    candidates.sort(key=lambda faq: faq["score"], reverse=True)
+    results = candidates[:k]
+
+    if not results and category:
+        results = list(db.faqs.find({"category": {"$regex": re.compile(re.escape(category), re.IGNORECASE)}}).limit(k))
+
+    for r in results:
+        r.pop("score", None)
+        r.setdefault("views", 0)
+        r.setdefault("helpful_yes", 0)
+        r.setdefault("helpful_total", 0)
+        r["_id"] = str(r["_id"])
+    return results
+
+
+def _search_faqs_mongo(query_text: str, category: str) -> list:
+    """
+    Search FAQs by text matching in question, answer, keywords.
+
+    Uses MongoDB's $or operator to search across multiple fields.
+    $regex does case-insensitive partial text matching.
     """
     db = get_database()
     import re
@@ -169,12 +334,6 @@ def search_faqs(query_text: str, category: str) -> list:
         }
     ).limit(3))
 
-    # Track FAQ impressions from student queries as "views"
-    if results:
-        from bson import ObjectId
-        ids = [r["_id"] for r in results if "_id" in r]
-        db.faqs.update_many({"_id": {"$in": ids}}, {"$inc": {"views": 1}})
-
     for r in results:
         r.setdefault("views", 0)
         r.setdefault("helpful_yes", 0)
@@ -209,6 +368,8 @@ def add_faq(category: str, question: str, answer: str, keywords: str) -> bool:
             "helpful_total": 0,
             "created_at": datetime.now().isoformat()
         })
+        bump_data_version("faqs")
+        _refresh_faq_search()
         return True
     except Exception as e:
         print(f"Error adding FAQ: {e}")
@@ -228,6 +389,8 @@ def update_faq(faq_id: str, answer: str, keywords: str) -> bool:
             {"_id": ObjectId(faq_id)},
             {"$set": {"answer": answer, "keywords": keywords}}
         )
+        bump_data_version("faqs")
+        _refresh_faq_search()
         return True
     except Exception as e:
         print(f"Error updating FAQ: {e}")
@@ -240,37 +403,53 @@ def delete_faq(faq_id: str) -> bool:
     db = get_database()
     try:
         db.faqs.delete_one({"_id": ObjectId(faq_id)})
+        bump_data_version("faqs")
+        _refresh_faq_search()
         return True
     except Exception as e:
         print(f"Error deleting FAQ: {e}")
         return False
 
 
+def _flush_faq_counters(increments: dict) -> None:
+    """Write buffered FAQ counter increments in one unordered bulk_write."""
+    from bson import ObjectId
+    from pymongo import UpdateOne
+
+    db = get_database()
+    db.faqs.bulk_write(
+        [UpdateOne({"_id": ObjectId(faq_id)}, {"$inc": fields}) for faq_id, fields in increments.items()],
+        ordered=False,
+    )
+
+
+# FAQ views and feedback are counted in memory and written every
+# FAQ_COUNTER_FLUSH_SECONDS (and at shutdown), so the chat path does no writes.
+faq_counters = CounterBuffer(
+    _flush_faq_counters,
+    flush_seconds=float(os.getenv("FAQ_COUNTER_FLUSH_SECONDS", "10")),
+    name="faq-counter-flush",
+)
+
+
 def record_faq_feedback(faq_id: str, is_helpful: bool) -> bool:
     """Record thumbs up/down style feedback for an FAQ."""
     from bson import ObjectId
-    db = get_database()
-    try:
-        inc = {"helpful_total": 1}
-        if is_helpful:
-            inc["helpful_yes"] = 1
-        db.faqs.update_one({"_id": ObjectId(faq_id)}, {"$inc": inc})
-        return True
-    except Exception as e:
-        print(f"Error recording FAQ feedback: {e}")
+    if not ObjectId.is_valid(faq_id):
         return False
+    faq_counters.add(faq_id, "helpful_total")
+    if is_helpful:
+        faq_counters.add(faq_id, "helpful_yes")
+    return True
 
 
 def increment_faq_view(faq_id: str) -> bool:
     """Increment FAQ view counter manually."""
     from bson import ObjectId
-    db = get_database()
-    try:
-        db.faqs.update_one({"_id": ObjectId(faq_id)}, {"$inc": {"views": 1}})
-        return True
-    except Exception as e:
-        print(f"Error incrementing FAQ view: {e}")
+    if not ObjectId.is_valid(faq_id):
         return False
+    faq_counters.add(faq_id, "views")
+    return True
 
 
 # ============================================================
@@ -298,6 +477,7 @@ def add_exam(subject: str, exam_date: str, exam_time: str,
             "venue":     venue,
             "semester":  semester
         })
+        bump_data_version("exams")
         return True
     except Exception as e:
         print(f"Error adding exam: {e}")
@@ -310,6 +490,7 @@ def delete_exam(exam_id: str) -> bool:
     db = get_database()
     try:
         db.exam_schedules.delete_one({"_id": ObjectId(exam_id)})
+        bump_data_version("exams")
         return True
     except Exception as e:
         print(f"Error deleting exam: {e}")
@@ -340,6 +521,7 @@ def add_fee(fee_type: str, amount: float,
             "due_date":    due_date,
             "description": description
         })
+        bump_data_version("fees")
         return True
     except Exception as e:
         print(f"Error adding fee: {e}")
@@ -352,6 +534,7 @@ def delete_fee(fee_id: str) -> bool:
     db = get_database()
     try:
         db.fee_structure.delete_one({"_id": ObjectId(fee_id)})
+        bump_data_version("fees")
         return True
     except Exception as e:
         print(f"Error deleting fee: {e}")
@@ -400,8 +583,80 @@ def add_student(
         return False
 
 
+def bulk_upsert_students(students: list) -> dict:
+    """
+    Create or update many student records in one unordered bulk_write.
+
+    Same fields as add_student(); passwords should already be hashed
+    (utils/password_pool.py) — plain ones are hashed here, one by one.
+
+    Returns:
+        dict: {"written": int, "inserted": int, "updated": int, "errors": [{"student_id", "error"}]}
+    """
+    from pymongo import UpdateOne
+    from pymongo.errors import BulkWriteError
+
+    result = {"written": 0, "inserted": 0, "updated": 0, "errors": []}
+    operations, op_student_ids = [], []
+    now = datetime.now().isoformat()
+    for student in students:
+        canonical_student_id = (student.get("student_id") or student.get("enrollment_no") or "").strip()
+        canonical_enrollment = (student.get("enrollment_no") or student.get("student_id") or "").strip()
+        if not canonical_student_id:
+            result["errors"].append({"student_id": "", "error": "student_id or enrollment_no is required"})
+            continue
+        password = student.get("password", "")
+        operations.append(
+            UpdateOne(
+                {"student_id": canonical_student_id},
+                {
+                    "$set": {
+                        "student_id": canonical_student_id,
+                        "full_name": student.get("full_name", ""),
+                        "password": password if _is_password_hash(password) else hash_password(password),
+                        "program": student.get("program", ""),
+                        "enrollment_no": canonical_enrollment,
+                        "semester": int(student.get("semester", 0) or 0),
+                        "updated_at": now,
+                    },
+                    "$setOnInsert": {"created_at": now},
+                },
+                upsert=True,
+            )
+        )
+        op_student_ids.append(canonical_student_id)
+    if not operations:
+        return result
+
+    db = get_database()
+    try:
+        write = db.students.bulk_write(operations, ordered=False)
+        details = write.bulk_api_result
+    except BulkWriteError as e:
+        # Unordered: every operation was attempted; only the listed ones failed
+        details = e.details
+        for error in details.get("writeErrors", []):
+            result["errors"].append({"student_id": op_student_ids[error["index"]], "error": error.get("errmsg", "")})
+    except Exception as e:
+        print(f"Error bulk writing students: {e}")
+        result["errors"].extend({"student_id": sid, "error": str(e)} for sid in op_student_ids)
+        return result
+
+    result["inserted"] = details.get("nUpserted", 0)
+    result["updated"] = details.get("nMatched", 0)
+    result["written"] = result["inserted"] + result["updated"]
+    return result
+
+
 def get_student_by_identifier_credentials(identifier: str, password: str) -> dict | None:
-    """Fetch a student by student_id OR enrollment_no + password."""
+    """
+    Fetch a student by student_id OR enrollment_no + password.
+
+    The PBKDF2 check runs on utils/password_pool.py's verification pool;
+    PasswordPoolBusy is passed on to the caller when that pool is full.
+    """
+    from utils.password_pool import PasswordPoolBusy, password_verifier
+
     db = get_database()
     try:
         student = db.students.find_one(
@@ -415,7 +670,7 @@ def get_student_by_identifier_credentials(identifier: str, password: str) -> dic
         if not student:
             return None
         stored_password = student.get("password", "")
-        if not verify_password(password, stored_password):
+        if not password_verifier.verify(password, stored_password):
             return None
         # Upgrade old plain-text records after a successful login.
         if stored_password and not _is_password_hash(stored_password):
@@ -424,6 +679,8 @@ def get_student_by_identifier_credentials(identifier: str, password: str) -> dic
             student["password"] = new_hash
         student["_id"] = str(student["_id"])
         return student
+    except PasswordPoolBusy:
+        raise
     except Exception as e:
         print(f"Error fetching student by identifier credentials: {e}")
         return None
@@ -581,7 +838,9 @@ def ensure_admin_account(default_password: str) -> bool:
 
 
 def verify_admin_credentials(password: str) -> bool:
-    """Verify admin password against stored hashed admin credentials."""
+    """Verify admin password against stored hashed admin credentials (on the verification pool)."""
+    from utils.password_pool import PasswordPoolBusy, password_verifier
+
     db = get_database()
     try:
         admin = db.admin_users.find_one({"admin_id": "admin"})
@@ -590,7 +849,9 @@ def verify_admin_credentials(password: str) -> bool:
         stored_password = admin.get("password", "")
         if not stored_password:
             return False
-        return verify_password(password, stored_password)
+        return password_verifier.verify(password, stored_password)
+    except PasswordPoolBusy:
+        raise
     except Exception as e:
         print(f"Error verifying admin credentials: {e}")
         return False
@@ -800,8 +1061,15 @@ def record_uploaded_pdf(
     category: str = "General",
     title: str = "",
     original_name: str = "",
+    content_hash: str = "",
+    chunk_ids: list | None = None,
 ) -> bool:
-    """Record a successfully processed PDF in MongoDB."""
+    """
+    Record a successfully processed PDF in MongoDB.
+
+    content_hash (SHA-256 of the file) lets an identical re-upload be
+    recognised; chunk_ids are the vector store ids of its chunks.
+    """
     db = get_database()
     try:
         db.uploaded_pdfs.insert_one({
@@ -811,10 +1079,13 @@ def record_uploaded_pdf(
             "category":      category,
             "pages":         pages,
             "chunks":        chunks,
+            "content_hash":  content_hash,
+            "chunk_ids":     chunk_ids or [],
             "download_count": 0,
             "uploaded_at":   datetime.now().isoformat(),
             "uploaded_by":   "admin"
         })
+        bump_data_version("pdfs")
         return True
     except Exception as e:
         print(f"Error recording PDF: {e}")
@@ -824,7 +1095,7 @@ def record_uploaded_pdf(
 def get_all_uploaded_pdfs() -> list:
     """Fetch all uploaded PDF records."""
     db = get_database()
-    pdfs = list(db.uploaded_pdfs.find().sort("uploaded_at", -1))
+    pdfs = list(db.uploaded_pdfs.find({}, {"chunk_ids": 0}).sort("uploaded_at", -1))
     for p in pdfs:
         p.setdefault("download_count", 0)
         p["_id"] = str(p["_id"])
@@ -847,12 +1118,88 @@ def get_uploaded_pdf_by_id(pdf_id: str) -> dict | None:
         return None
 
 
+def find_uploaded_pdf_by_hash(content_hash: str) -> dict | None:
+    """Fetch the PDF record with this file SHA-256, if one was uploaded before."""
+    if not content_hash:
+        return None
+    db = get_database()
+    try:
+        doc = db.uploaded_pdfs.find_one({"content_hash": content_hash}, {"chunk_ids": 0})
+        if not doc:
+            return None
+        doc["_id"] = str(doc["_id"])
+        return doc
+    except Exception as e:
+        print(f"Error fetching uploaded PDF by hash: {e}")
+        return None
+
+
+def find_uploaded_pdf_by_filename(filename: str) -> dict | None:
+    """Fetch the PDF record stored under this filename (a re-upload replaces it)."""
+    if not filename:
+        return None
+    db = get_database()
+    try:
+        doc = db.uploaded_pdfs.find_one({"filename": filename})
+        if not doc:
+            return None
+        doc["_id"] = str(doc["_id"])
+        return doc
+    except Exception as e:
+        print(f"Error fetching uploaded PDF by filename: {e}")
+        return None
+
+
+def get_chunk_ids_in_use(chunk_ids: list) -> set:
+    """Which of these vector store ids are still referenced by some PDF record."""
+    if not chunk_ids:
+        return set()
+    db = get_database()
+    referenced = db.uploaded_pdfs.distinct("chunk_ids", {"chunk_ids": {"$in": list(chunk_ids)}})
+    return set(referenced) & set(chunk_ids)
+
+
+def get_chunk_owner_names(chunk_ids: list) -> dict:
+    """{chunk id: display name of one PDF record that references it} for these ids."""
+    if not chunk_ids:
+        return {}
+    wanted = set(chunk_ids)
+    db = get_database()
+    owners = {}
+    cursor = db.uploaded_pdfs.find({"chunk_ids": {"$in": list(wanted)}}, {"filename": 1, "original_name": 1, "chunk_ids": 1})
+    for record in cursor:
+        name = record.get("original_name") or record.get("filename", "")
+        for cid in wanted.intersection(record.get("chunk_ids") or []):
+            owners.setdefault(cid, name)
+    return owners
+
+
+def get_pdf_index_refs() -> tuple[set, set, set]:
+    """
+    Everything the vector store should still hold, for compaction.
+
+    Returns (chunk ids referenced by PDF records, names of records
+    uploaded before chunk ids were tracked — their chunks are matched by
+    the source_file metadata instead — and names of the other records).
+    A record's chunks are labelled with either its stored filename or its
+    original_name depending on how it was uploaded, so both are returned.
+    """
+    db = get_database()
+    chunk_ids = set(db.uploaded_pdfs.distinct("chunk_ids"))
+    legacy_names, tracked_names = set(), set()
+    for doc in db.uploaded_pdfs.find({}, {"filename": 1, "original_name": 1, "chunk_ids": {"$slice": 1}}):
+        names = legacy_names if not doc.get("chunk_ids") else tracked_names
+        names.update(name for name in (doc.get("filename"), doc.get("original_name")) if name)
+    return chunk_ids, legacy_names, tracked_names
+
+
 def delete_uploaded_pdf_record(pdf_id: str) -> bool:
     """Delete a PDF record from MongoDB."""
     from bson import ObjectId
     db = get_database()
     try:
         db.uploaded_pdfs.delete_one({"_id": ObjectId(pdf_id)})
+        bump_data_version("pdfs")
         return True
     except Exception as e:
         print(f"Error deleting PDF record: {e}")
@@ -1,4 +1,5 @@
-﻿import os
+﻿import hashlib
+import os
 import sys
 from datetime import datetime
 
@@ -111,12 +112,15 @@ try:
         delete_faq,
         delete_fee,
         delete_uploaded_pdf_record,
+        find_uploaded_pdf_by_filename,
+        find_uploaded_pdf_by_hash,
         get_all_exams,
         get_all_faqs,
         get_all_fees,
         get_all_uploaded_pdfs,
         get_escalated_queries,
         get_statistics,
+        get_uploaded_pdf_by_id,
         record_uploaded_pdf,
         update_escalated_query,
         update_faq,
@@ -266,20 +270,41 @@ with tab3:
             if st.button("Upload and Process", type="primary", use_container_width=True):
                 with st.spinner("Processing PDF..."):
                     try:
-                        os.makedirs("uploaded_pdfs", exist_ok=True)
-                        save_path = os.path.join("uploaded_pdfs", uploaded_file.name)
-                        with open(save_path, "wb") as file_out:
-                            file_out.write(uploaded_file.getbuffer())
-
-                        from utils.pdf_processor import PDFProcessor
-
-                        result = PDFProcessor().process_pdf(save_path, uploaded_file.name)
-                        if result["success"]:
-                            record_uploaded_pdf(uploaded_file.name, result["pages"], result["chunks"])
-                            st.success(f"Processed. Pages: {result['pages']} | Chunks: {result['chunks']}")
-                            st.rerun()
+                        content_hash = hashlib.sha256(uploaded_file.getbuffer()).hexdigest()
+                        existing = find_uploaded_pdf_by_hash(content_hash)
+                        if existing:
+                            st.info(f"This file is already uploaded as {existing.get('original_name', existing['filename'])}.")
                         else:
-                            st.error(result.get("error", "Processing failed."))
+                            # Same name as an earlier upload: the new file replaces it
+                            previous = find_uploaded_pdf_by_filename(uploaded_file.name)
+                            os.makedirs("uploaded_pdfs", exist_ok=True)
+                            save_path = os.path.join("uploaded_pdfs", uploaded_file.name)
+                            with open(save_path, "wb") as file_out:
+                                file_out.write(uploaded_file.getbuffer())
+
+                            from utils.embeddings import get_pdf_processor
+
+                            processor = get_pdf_processor()
+                            result = processor.process_pdf(save_path, uploaded_file.name)
+                            if result["success"]:
+                                try:
+                                    record_uploaded_pdf(
+                                        uploaded_file.name,
+                                        result["pages"],
+                                        result["chunks"],
+                                        content_hash=content_hash,
+                                        chunk_ids=result.get("chunk_ids"),
+                                    )
+                                    if previous:
+                                        delete_uploaded_pdf_record(previous["_id"])
+                                        # The new upload shares previous' filename: keep its chunks
+                                        processor.remove_document(previous, keep=result.get("chunk_ids") or [])
+                                finally:
+                                    processor.release_chunks(result.get("chunk_ids") or [])
+                                st.success(f"Processed. Pages: {result['pages']} | Chunks: {result['chunks']}")
+                                st.rerun()
+                            else:
+                                st.error(result.get("error", "Processing failed."))
                     except Exception as exc:
                         st.error(f"Upload failed: {exc}")
 
@@ -297,7 +322,12 @@ with tab3:
                 st.caption(f"Pages: {pdf.get('pages', 0)} | Chunks: {pdf.get('chunks', 0)}")
             with col_d:
                 if st.button("Delete", key=f"pdf_del_{pdf['_id']}", use_container_width=True):
+                    record = get_uploaded_pdf_by_id(pdf["_id"])
                     delete_uploaded_pdf_record(pdf["_id"])
+                    if record:
+                        from utils.embeddings import get_pdf_processor
+
+                        get_pdf_processor().remove_document(record)
                     file_path = os.path.join("uploaded_pdfs", pdf.get("filename", ""))
                     if os.path.exists(file_path):
                         os.remove(file_path)
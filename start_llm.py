@@ -5,6 +5,8 @@ import sys
 import os
 from dotenv import load_dotenv
 
+from utils.ollama_client import get_session, request_timeout
+
 load_dotenv()
 
 # ---- CONFIGURATION ----
@@ -17,13 +19,14 @@ def is_ollama_running() -> bool:
     Ping Ollama's API endpoint to see if it's running.
     Returns True if running, False if not.
 
-    Why requests.get? Ollama runs as a local web server.
-    We check it the same way a browser checks a website.
+    Why an HTTP GET? Ollama runs as a local web server.
+    We check it the same way a browser checks a website, reusing the
+    shared keep-alive session so repeated pings don't open new sockets.
     """
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{OLLAMA_BASE_URL}/api/tags",
-            timeout=3
+            timeout=request_timeout(3)
         )
         return response.status_code == 200
     except requests.exceptions.ConnectionError:
@@ -40,9 +43,9 @@ def is_model_available() -> bool:
     Returns True if available, False if not.
     """
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{OLLAMA_BASE_URL}/api/tags",
-            timeout=5
+            timeout=request_timeout(5)
         )
         if response.status_code == 200:
             data = response.json()
@@ -145,7 +148,7 @@ def test_llm_response() -> bool:
     """
     print("🧪 Testing LLM response with a quick message...")
     try:
-        response = requests.post(
+        response = get_session().post(
             f"{OLLAMA_BASE_URL}/api/generate",
             json={
                 "model": MODEL_NAME,
@@ -155,7 +158,7 @@ def test_llm_response() -> bool:
                     "num_predict": 5   # Only generate 5 tokens — keeps test fast
                 }
             },
-            timeout=60
+            timeout=request_timeout(60)
         )
 
         if response.status_code == 200:
@@ -0,0 +1,119 @@
+"""
+utils/ann_index.py
+===================
+Approximate nearest-neighbour search over the NumPy vector index.
+
+Exact search scores every stored chunk, which stays fast for tens of
+thousands of chunks but grows linearly. With VECTOR_ANN=hnsw the NumPy
+backend (utils/vector_index.py) also keeps a faiss HNSW graph over its
+matrix rows — built in-process, CPU only — and answers queries from it
+once the index holds ANN_MIN_ROWS chunks:
+
+  HNSW_M               graph links per node (memory / build time ↔ recall)
+  HNSW_EF_CONSTRUCTION candidate list while inserting (build time ↔ recall)
+  HNSW_EF_SEARCH       candidate list while querying (latency ↔ recall)
+
+New PDFs are inserted incrementally: the graph only ever appends the
+matrix rows it has not seen yet. Deleted rows stay in the graph and are
+filtered out of results until compaction rebuilds it. float16 matrices
+use an fp16 scalar-quantized graph so the copy faiss keeps is half size.
+
+Check what a setting costs in recall with `python -m utils.ann_recall`.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import List, Tuple
+
+VECTOR_ANN = os.getenv("VECTOR_ANN", "off").strip().lower()
+ANN_MIN_ROWS = int(os.getenv("ANN_MIN_ROWS", "50000"))
+HNSW_M = int(os.getenv("HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "80"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+# Matrix rows handed to faiss per add() call
+ADD_BLOCK_ROWS = 65536
+
+
+class HNSWGraph:
+    """faiss HNSW graph whose node i is row i of the NumPy index matrix."""
+
+    def __init__(self, dim: int, half_precision: bool = False, path: str = ""):
+        import faiss
+
+        self._faiss = faiss
+        self.path = path
+        self._graph = None
+        if path and os.path.exists(path):
+            try:
+                self._graph = faiss.read_index(path)
+            except Exception as e:
+                print(f"⚠️  Could not read ANN graph {path}, rebuilding: {e}")
+        if self._graph is None:
+            if half_precision:
+                self._graph = faiss.IndexHNSWSQ(
+                    dim, faiss.ScalarQuantizer.QT_fp16, HNSW_M, faiss.METRIC_INNER_PRODUCT
+                )
+            else:
+                self._graph = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            self._graph.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        self._graph.hnsw.efSearch = HNSW_EF_SEARCH
+
+    @property
+    def size(self) -> int:
+        return self._graph.ntotal
+
+    @property
+    def ef_search(self) -> int:
+        return self._graph.hnsw.efSearch
+
+    @ef_search.setter
+    def ef_search(self, value: int) -> None:
+        self._graph.hnsw.efSearch = max(1, int(value))
+
+    def extend(self, matrix) -> int:
+        """Insert the matrix rows the graph has not seen yet; returns how many."""
+        import numpy as np
+
+        start = self._graph.ntotal
+        total = matrix.shape[0]
+        for offset in range(start, total, ADD_BLOCK_ROWS):
+            block = np.ascontiguousarray(matrix[offset:offset + ADD_BLOCK_ROWS], dtype=np.float32)
+            if not self._graph.is_trained:
+                self._graph.train(block)
+            self._graph.add(block)
+        return total - start
+
+    def search(self, vector, k: int) -> Tuple[List[int], List[float]]:
+        import numpy as np
+
+        q = np.asarray(vector, dtype=np.float32).reshape(1, -1)
+        scores, rows = self._graph.search(q, k)
+        hits = [(int(row), float(score)) for row, score in zip(rows[0], scores[0]) if row >= 0]
+        return [row for row, _ in hits], [score for _, score in hits]
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        tmp_path = self.path + ".tmp"
+        self._faiss.write_index(self._graph, tmp_path)
+        os.replace(tmp_path, self.path)
+
+
+_enabled = None
+
+
+def ann_enabled() -> bool:
+    """VECTOR_ANN=hnsw and faiss importable (checked once per process)."""
+    global _enabled
+    if _enabled is None:
+        _enabled = False
+        if VECTOR_ANN == "hnsw":
+            try:
+                import faiss  # noqa: F401
+
+                _enabled = True
+            except ImportError as e:
+                print(f"⚠️  VECTOR_ANN=hnsw but faiss is not installed, using exact search: {e}")
+    return _enabled
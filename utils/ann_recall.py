@@ -0,0 +1,93 @@
+"""
+utils/ann_recall.py
+====================
+recall@k of the HNSW graph against exact search, per efSearch setting.
+
+Queries are stored chunk vectors with a little noise added (close to how
+a real question lands near its answer chunk). For each efSearch value
+this prints recall@k — the share of the exact top-k the graph also
+returns — and mean query latency next to exact search:
+
+    python -m utils.ann_recall                      # the NumPy index in vector_db/numpy
+    python -m utils.ann_recall --synthetic 300000   # random unit vectors
+
+The graph is built here in memory with the HNSW_* settings, so this
+works whether or not VECTOR_ANN is on.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ann_index import HNSW_EF_CONSTRUCTION, HNSW_M, HNSWGraph
+from utils.pdf_processor import VECTOR_DB_DIR
+from utils.vector_index import EMBEDDING_DIM, NumpyIndex, index_directory
+
+
+def _load_matrix(np, args):
+    if args.synthetic:
+        rng = np.random.default_rng(args.seed)
+        matrix = rng.standard_normal((args.synthetic, EMBEDDING_DIM)).astype(np.float32)
+        return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    directory = index_directory(VECTOR_DB_DIR, "numpy")
+    if not NumpyIndex.exists(directory):
+        return None
+    return np.asarray(NumpyIndex(directory).matrix, dtype=np.float32)
+
+
+def main() -> int:
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, default=0, help="use this many random vectors instead of vector_db")
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--ef", default="16,32,64,128,256", help="comma-separated efSearch values")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    matrix = _load_matrix(np, args)
+    if matrix is None or len(matrix) == 0:
+        print("⏭️  No NumPy vector index on disk. Use --synthetic N or VECTOR_BACKEND=numpy.")
+        return 0
+
+    rng = np.random.default_rng(args.seed + 1)
+    picks = rng.choice(len(matrix), size=min(args.queries, len(matrix)), replace=False)
+    queries = matrix[picks] + rng.standard_normal((len(picks), matrix.shape[1])).astype(np.float32) * args.noise
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    k = min(args.k, len(matrix))
+
+    started = time.perf_counter()
+    truth = []
+    for q in queries:
+        scores = matrix @ q
+        truth.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+    exact_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+    print(f"{len(matrix)} chunks, {len(queries)} queries, k={k}, HNSW M={HNSW_M} efConstruction={HNSW_EF_CONSTRUCTION}")
+    started = time.perf_counter()
+    graph = HNSWGraph(matrix.shape[1])
+    graph.extend(matrix)
+    print(f"graph build     {time.perf_counter() - started:8.1f} s")
+    print(f"exact           {exact_ms:8.3f} ms/query   recall@{k} 1.000")
+
+    for ef in [int(value) for value in args.ef.split(",") if value.strip()]:
+        graph.ef_search = ef
+        hits = 0
+        started = time.perf_counter()
+        for q, expected in zip(queries, truth):
+            rows, _ = graph.search(q, k)
+            hits += len(expected.intersection(rows))
+        ann_ms = (time.perf_counter() - started) * 1000 / len(queries)
+        print(f"efSearch={ef:<6} {ann_ms:8.3f} ms/query   recall@{k} {hits / (len(queries) * k):.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+utils/answer_cache.py
+======================
+Exact-match cache of chat answers.
+
+Around fee deadlines and exams many students ask the same question in
+the same words. Each one would otherwise run query analysis, Mongo/PDF
+retrieval and a full phi3 generation. The cache stores the final chat
+payload keyed on:
+  - the normalized question (case, punctuation and spacing ignored)
+  - the data version stamp from database.mongo_db.get_data_version()
+
+Any FAQ/exam/fee/PDF write bumps the version stamp, so answers built
+from old data can never be served again; they simply stop matching and
+are purged when the first answer for the newer version is stored.
+Entries also expire after ANSWER_CACHE_TTL_SECONDS (covers edits made
+by other worker processes) and the least recently used entry is
+evicted beyond ANSWER_CACHE_SIZE.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def normalize_query(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    text = re.sub(r"[^a-z0-9\s]", " ", (text or "").lower())
+    return " ".join(text.split())
+
+
+class AnswerCache:
+    """Thread-safe LRU + TTL cache of chat response payloads."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max(0, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._current_version = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(query: str, data_version: int) -> Tuple[str, int]:
+        return (normalize_query(query), data_version)
+
+    def get(self, key: Tuple[str, int]) -> Optional[Dict[str, Any]]:
+        if self.max_entries == 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            created_at, payload = entry
+            if time.monotonic() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, key: Tuple[str, int], payload: Dict[str, Any]) -> None:
+        if self.max_entries == 0 or not key[0]:
+            return
+        with self._lock:
+            data_version = key[1]
+            if data_version < self._current_version:
+                # Built from data that changed while the answer was generated.
+                return
+            if data_version > self._current_version:
+                # The underlying data changed: every stored answer is stale.
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._current_version = data_version
+            self._entries[key] = (time.monotonic(), payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+answer_cache = AnswerCache(
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "512")),
+    ttl_seconds=float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "600")),
+)
@@ -0,0 +1,100 @@
+"""
+utils/bench_token_store.py
+===========================
+Auth check cost with many live sessions: TokenStore vs the old full scan.
+
+The old scheme kept {token: {"expires_at": iso string, ...}} dicts and
+parsed every expiry on each request before the lookup. This fills both
+with the same sessions (a share of them already expired) and times one
+validation per simulated request:
+
+    python -m utils.bench_token_store --sessions 50000 --requests 2000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.token_store import TokenStore
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def _legacy_validate(tokens: dict, token: str):
+    # What require_student() used to do: scan and parse everything, then look up
+    now = datetime.now()
+    expired = []
+    for key, data in tokens.items():
+        try:
+            exp_dt = datetime.fromisoformat(data.get("expires_at", ""))
+        except ValueError:
+            exp_dt = now
+        if exp_dt < now:
+            expired.append(key)
+    for key in expired:
+        tokens.pop(key, None)
+    return tokens.get(token)
+
+
+def _report(name: str, latencies: list) -> None:
+    print(
+        f"{name:<12} p50 {_percentile(latencies, 0.5):9.4f} ms   "
+        f"p95 {_percentile(latencies, 0.95):9.4f} ms   "
+        f"total {sum(latencies):9.1f} ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50000)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--expired-share", type=float, default=0.1, help="share of sessions already expired")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    legacy = {}
+    store = TokenStore("bench")
+    now = time.time()
+    live_tokens = []
+    for i in range(args.sessions):
+        expired = rng.random() < args.expired_share
+        expires_at = now - rng.uniform(1, 3600) if expired else now + rng.uniform(60, 8 * 3600)
+        token = f"token-{i}"
+        data = {"student_id": f"S{i}", "expires_at": datetime.fromtimestamp(expires_at).isoformat()}
+        legacy[token] = dict(data)
+        store.add(token, data, expires_at)
+        if not expired:
+            live_tokens.append(token)
+
+    lookups = [rng.choice(live_tokens) for _ in range(args.requests)]
+    print(f"{args.sessions} sessions ({args.expired_share:.0%} expired), {args.requests} requests")
+
+    latencies = []
+    for token in lookups:
+        started = time.perf_counter()
+        assert _legacy_validate(legacy, token) is not None
+        latencies.append((time.perf_counter() - started) * 1000)
+    _report("full scan", latencies)
+
+    latencies = []
+    for token in lookups:
+        started = time.perf_counter()
+        assert store.get(token) is not None
+        latencies.append((time.perf_counter() - started) * 1000)
+    _report("TokenStore", latencies)
+    print(f"TokenStore after run: {store.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+utils/bench_vector_index.py
+============================
+Compare the Chroma and NumPy vector index backends on synthetic data.
+
+Random unit vectors stand in for chunk embeddings, so no model is
+loaded. For each backend this reports open time, insert throughput and
+query latency (p50 / p95) over the same vectors and queries, plus
+top-k agreement with an exact brute-force search:
+
+    python -m utils.bench_vector_index --chunks 20000 --queries 200
+
+Backends whose libraries are missing are skipped.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.vector_index import EMBEDDING_DIM, ChromaIndex, NumpyIndex
+
+
+def _unit_vectors(np, rng, count: int):
+    vectors = rng.standard_normal((count, EMBEDDING_DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def bench(name: str, make_index, vectors, queries, truth, k: int) -> None:
+    directory = tempfile.mkdtemp(prefix=f"bench_{name}_")
+    try:
+        started = time.perf_counter()
+        index = make_index(directory)
+        open_seconds = time.perf_counter() - started
+
+        ids = [f"chunk-{i}" for i in range(len(vectors))]
+        metadatas = [{"source_file": "bench.pdf"} for _ in ids]
+        documents = [f"chunk text {i}" for i in range(len(vectors))]
+        started = time.perf_counter()
+        index.upsert(ids, vectors.tolist(), metadatas, documents)
+        index.persist()
+        insert_seconds = time.perf_counter() - started
+
+        latencies = []
+        overlap = 0
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            hits = index.query(query.tolist(), k)
+            latencies.append((time.perf_counter() - started) * 1000)
+            found = {int(cid.rsplit("-", 1)[1]) for cid, _, _, _ in hits}
+            overlap += len(found & expected)
+
+        print(
+            f"{name:<14} open {open_seconds * 1000:8.1f} ms | "
+            f"insert {len(vectors) / insert_seconds:9.0f} chunks/s | "
+            f"query p50 {_percentile(latencies, 0.5):7.2f} ms  p95 {_percentile(latencies, 0.95):7.2f} ms | "
+            f"top-{k} match {overlap / (len(queries) * k):.3f}"
+        )
+    except ImportError as e:
+        print(f"{name:<14} skipped ({e})")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main() -> int:
+    import numpy as np
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = _unit_vectors(np, rng, args.chunks)
+    queries = _unit_vectors(np, rng, args.queries)
+    scores = queries @ vectors.T
+    truth = [set(np.argsort(-row)[:args.k].tolist()) for row in scores]
+
+    print(f"{args.chunks} chunks × {EMBEDDING_DIM}d, {args.queries} queries, k={args.k}")
+    bench("chroma", lambda d: ChromaIndex(d, load_model=False), vectors, queries, truth, args.k)
+    bench("numpy float32", lambda d: NumpyIndex(d, dtype="float32"), vectors, queries, truth, args.k)
+    bench("numpy float16", lambda d: NumpyIndex(d, dtype="float16"), vectors, queries, truth, args.k)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
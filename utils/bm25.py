@@ -0,0 +1,143 @@
+"""
+utils/bm25.py
+==============
+Small in-process BM25 inverted index.
+
+Embedding search is good at meaning but weak at exact tokens: a student
+asking about "ATT-02" or "CS301" wants the chunk with that code in it.
+BM25 scores documents by how often the query's terms occur in them,
+weighted by how rare each term is, so those codes rank first.
+
+The index is maintained incrementally — add() and remove() update the
+postings and corpus statistics in place, scores are computed at query
+time — and is safe to use from several threads.
+
+Tokens are lowercase alphanumeric runs; codes joined by "-", "_" or "/"
+are indexed both whole and in parts, so "ATT-02", "att 02" and "att02"
+style queries all find the form.
+"""
+
+from __future__ import annotations
+
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Tuple
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_/][a-z0-9]+)*")
+_SPLIT_RE = re.compile(r"[-_/]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word/code tokens; compound codes also yield their parts and joined form."""
+    tokens = []
+    for match in _TOKEN_RE.findall((text or "").lower()):
+        tokens.append(match)
+        parts = _SPLIT_RE.split(match)
+        if len(parts) > 1:
+            tokens.extend(part for part in parts if part)
+            tokens.append("".join(parts))
+    return tokens
+
+
+class BM25Index:
+    """Inverted index: term → {doc id: term frequency}, plus document lengths."""
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B, stopwords: Iterable[str] = ()):
+        self.k1 = k1
+        self.b = b
+        self.stopwords = frozenset(stopwords)
+        self._postings: Dict[str, Dict[Hashable, int]] = {}
+        self._lengths: Dict[Hashable, int] = {}
+        self._terms_of: Dict[Hashable, List[str]] = {}  # kept only for remove()
+        self._total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def __contains__(self, doc_id: Hashable) -> bool:
+        return doc_id in self._lengths
+
+    def _tokens(self, text: str) -> List[str]:
+        tokens = tokenize(text)
+        if self.stopwords:
+            tokens = [token for token in tokens if token not in self.stopwords]
+        return tokens
+
+    def add(self, doc_id: Hashable, text: str) -> None:
+        """Index one document (replacing an earlier version with the same id)."""
+        counts = Counter(self._tokens(text))
+        with self._lock:
+            if doc_id in self._lengths:
+                self.remove(doc_id)
+            for term, tf in counts.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            length = sum(counts.values())
+            self._lengths[doc_id] = length
+            self._total_length += length
+            self._terms_of[doc_id] = list(counts)
+
+    def add_many(self, docs: Iterable[Tuple[Hashable, str]]) -> None:
+        for doc_id, text in docs:
+            self.add(doc_id, text)
+
+    def remove(self, doc_id: Hashable) -> None:
+        with self._lock:
+            length = self._lengths.pop(doc_id, None)
+            if length is None:
+                return
+            self._total_length -= length
+            for term in self._terms_of.pop(doc_id, []):
+                posting = self._postings.get(term)
+                if posting is None:
+                    continue
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._terms_of.clear()
+            self._total_length = 0
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[Hashable, float]]:
+        """Top-k (doc id, score) pairs, best first; [] when no query term is indexed."""
+        terms = set(self._tokens(query))
+        scores: Dict[Hashable, float] = {}
+        with self._lock:
+            count = len(self._lengths)
+            if not count or not terms:
+                return []
+            avg_length = self._total_length / count
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[Hashable]], k: int = 60) -> List[Hashable]:
+    """
+    Merge several best-first id lists into one.
+
+    Each id scores sum(1 / (k + rank)) over the lists it appears in, so
+    ids ranked well by both lexical and vector search come out on top
+    without having to calibrate their scores against each other.
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
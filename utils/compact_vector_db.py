@@ -0,0 +1,39 @@
+"""
+utils/compact_vector_db.py
+===========================
+Rebuild vector_db/ with only the chunks of PDFs that still exist.
+
+Deleting a PDF removes its chunks from Chroma, but Chroma keeps the
+space, and stale chunks of re-uploaded PDFs can stay behind. Chunks that
+no PDF record owns at all are kept and reported, not deleted. Run this occasionally with the API stopped
+(or use POST /api/admin/pdfs/compact while it is running):
+
+    python -m utils.compact_vector_db
+"""
+
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.mongo_db import get_pdf_index_refs
+from utils.embeddings import get_pdf_processor
+
+
+def main() -> int:
+    processor = get_pdf_processor()
+    if not processor.has_knowledge_base():
+        print("⏭️  No PDF knowledge base on disk. Nothing to compact.")
+        return 0
+
+    live_ids, legacy_names, tracked_names = get_pdf_index_refs()
+    result = processor.compact(live_ids, legacy_names, tracked_names)
+    print(f"✅ Kept {result['after']} chunks, removed {result['removed']}")
+    if result["unowned"]:
+        print(f"⚠️  {result['unowned']} kept chunks belong to no PDF record; delete them by hand if they are stale")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""
+utils/counter_buffer.py
+========================
+Coalesce counter increments in memory and write them in batches.
+
+Counting every FAQ impression and thumbs-up as its own MongoDB update
+turns the busiest read path (chat) into a write path. CounterBuffer
+collects increments per document — {doc id: {field: amount}} — and
+hands the whole batch to a flush function every flush_seconds from a
+background thread, on flush() (e.g. at shutdown), and at interpreter
+exit. A failed flush puts its increments back so they go out with the
+next one.
+"""
+
+from __future__ import annotations
+
+import atexit
+import threading
+from typing import Callable, Dict, Optional
+
+Increments = Dict[str, Dict[str, int]]
+
+
+class CounterBuffer:
+    """Thread-safe increment buffer with a periodic background flush."""
+
+    def __init__(self, flush_fn: Callable[[Increments], None], flush_seconds: float, name: str = "counter-flush"):
+        self.flush_fn = flush_fn
+        self.flush_seconds = max(0.1, flush_seconds)
+        self.name = name
+        self._pending: Increments = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.increments = 0
+        self.flushes = 0
+        self.docs_written = 0
+        self.failures = 0
+        # Once per buffer; the thread can be restarted after stop()
+        atexit.register(self.flush)
+
+    def add(self, doc_id: str, field: str, amount: int = 1) -> None:
+        with self._lock:
+            fields = self._pending.setdefault(doc_id, {})
+            fields[field] = fields.get(field, 0) + amount
+            self.increments += 1
+        self._ensure_thread()
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._stop.clear()
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_seconds):
+            self.flush()
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns how many documents were updated."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if not batch:
+                return 0
+            try:
+                self.flush_fn(batch)
+            except Exception as e:
+                self.failures += 1
+                print(f"⚠️  {self.name}: flush failed, will retry: {e}")
+                with self._lock:
+                    for doc_id, fields in batch.items():
+                        pending = self._pending.setdefault(doc_id, {})
+                        for field, amount in fields.items():
+                            pending[field] = pending.get(field, 0) + amount
+                return 0
+            self.flushes += 1
+            self.docs_written += len(batch)
+            return len(batch)
+
+    def stop(self) -> None:
+        """Stop the background thread and flush what is left."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout=self.flush_seconds + 1)
+            self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "pending_docs": pending,
+            "increments": self.increments,
+            "flushes": self.flushes,
+            "docs_written": self.docs_written,
+            "failures": self.failures,
+        }
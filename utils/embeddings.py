@@ -0,0 +1,259 @@
+"""
+utils/embeddings.py
+====================
+Process-wide registry for the embedding model and the PDF vector store.
+
+Loading all-MiniLM-L6-v2 (~90MB + torch start-up) takes seconds, and
+opening the Chroma store on disk is not free either. Everything that
+needs them — PDF search in the retrieval agent, PDF uploads, the
+semantic answer cache — goes through this module so each is loaded
+exactly once per process, lazily, and the load times are recorded for
+/api/admin/perf.
+
+Bulk embedding (PDF ingestion) goes through embed_documents(), which
+encodes in EMBED_BATCH_SIZE batches on EMBED_THREADS torch threads, or
+across EMBED_PROCESSES worker processes for large jobs, and tracks
+throughput in chunks/sec.
+
+Question embedding (PDF search, semantic answer cache) goes through
+embed_query(), which keeps recent query vectors in an LRU cache of at
+most QUERY_EMBED_CACHE_MB, so a popular question skips the model
+forward pass — and is embedded once per request, not once per user.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_THREADS = int(os.getenv("EMBED_THREADS", "0")) or (os.cpu_count() or 1)
+EMBED_PROCESSES = int(os.getenv("EMBED_PROCESSES", "1"))
+# Spawning worker processes costs a model load each; only worth it for big jobs
+EMBED_PROCESS_MIN_CHUNKS = int(os.getenv("EMBED_PROCESS_MIN_CHUNKS", "2000"))
+QUERY_EMBED_CACHE_MB = float(os.getenv("QUERY_EMBED_CACHE_MB", "16"))
+
+# Rough per-entry bookkeeping on top of the key text and float32 vector
+_QUERY_ENTRY_OVERHEAD_BYTES = 200
+
+_embeddings = None
+_pdf_processor = None
+_lock = threading.RLock()
+_metrics: Dict[str, Any] = {
+    "model_name": EMBEDDING_MODEL_NAME,
+    "model_loaded": False,
+    "model_load_seconds": None,
+    "vectorstore_open_seconds": None,
+    "batch_size": EMBED_BATCH_SIZE,
+    "torch_threads": EMBED_THREADS,
+    "processes": EMBED_PROCESSES,
+    "chunks_embedded": 0,
+    "embed_seconds": 0.0,
+    "last_job_chunks_per_sec": None,
+}
+
+
+def get_embeddings():
+    """
+    Return the shared HuggingFaceEmbeddings instance, loading it on first call.
+
+    Vectors are normalized, so cosine similarity is a plain dot product.
+    Raises ImportError if the langchain / sentence-transformers stack is missing.
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                from langchain_community.embeddings import HuggingFaceEmbeddings
+
+                print(f"🧮 Loading embedding model '{EMBEDDING_MODEL_NAME}'...")
+                started = time.perf_counter()
+                try:
+                    import torch
+
+                    # Use every core for matrix math inside one encode() call
+                    torch.set_num_threads(EMBED_THREADS)
+                except Exception as e:
+                    print(f"⚠️  Could not set torch threads: {e}")
+                embeddings = HuggingFaceEmbeddings(
+                    model_name=EMBEDDING_MODEL_NAME,
+                    model_kwargs={"device": "cpu"},
+                    encode_kwargs={"normalize_embeddings": True, "batch_size": EMBED_BATCH_SIZE}
+                )
+                _metrics["model_load_seconds"] = round(time.perf_counter() - started, 3)
+                _metrics["model_loaded"] = True
+                print(f"✅ Embedding model ready in {_metrics['model_load_seconds']}s")
+                _embeddings = embeddings
+    return _embeddings
+
+
+def embed_documents(texts: List[str], progress: Optional[Callable[[int], None]] = None) -> List[List[float]]:
+    """
+    Embed many texts with the shared model, reporting progress as batches finish.
+
+    Parameters:
+        texts    (list):     Chunk texts to embed
+        progress (callable): Optional progress(done_count) hook
+
+    Returns:
+        list of normalized 384-d vectors, in the same order as texts
+    """
+    if not texts:
+        return []
+
+    model = get_embeddings().client  # the underlying SentenceTransformer
+    started = time.perf_counter()
+    vectors: List[List[float]] = []
+
+    if EMBED_PROCESSES > 1 and len(texts) >= EMBED_PROCESS_MIN_CHUNKS:
+        import numpy as np
+
+        pool = model.start_multi_process_pool(target_devices=["cpu"] * EMBED_PROCESSES)
+        try:
+            # Hand each worker a few batches at a time so progress keeps moving
+            step = EMBED_BATCH_SIZE * EMBED_PROCESSES * 4
+            for start in range(0, len(texts), step):
+                block = model.encode_multi_process(texts[start:start + step], pool, batch_size=EMBED_BATCH_SIZE)
+                norms = np.linalg.norm(block, axis=1, keepdims=True)
+                vectors.extend((block / np.maximum(norms, 1e-12)).tolist())
+                if progress:
+                    progress(len(vectors))
+        finally:
+            model.stop_multi_process_pool(pool)
+    else:
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            block = model.encode(
+                texts[start:start + EMBED_BATCH_SIZE],
+                batch_size=EMBED_BATCH_SIZE,
+                normalize_embeddings=True,
+                show_progress_bar=False,
+            )
+            vectors.extend(block.tolist())
+            if progress:
+                progress(len(vectors))
+
+    elapsed = time.perf_counter() - started
+    with _lock:
+        _metrics["chunks_embedded"] += len(texts)
+        _metrics["embed_seconds"] = round(_metrics["embed_seconds"] + elapsed, 3)
+        _metrics["last_job_chunks_per_sec"] = round(len(texts) / elapsed, 1) if elapsed > 0 else None
+    return vectors
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU of query text → float32 vector, bounded by total bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, max_bytes)
+        self._entries: "OrderedDict[str, array]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _size(key: str, vector: array) -> int:
+        return len(key) + vector.itemsize * len(vector) + _QUERY_ENTRY_OVERHEAD_BYTES
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return vector.tolist()
+
+    def put(self, key: str, vector: List[float]) -> None:
+        packed = array("f", vector)
+        size = self._size(key, packed)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= self._size(key, old)
+            self._entries[key] = packed
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                old_key, old_vector = self._entries.popitem(last=False)
+                self._bytes -= self._size(old_key, old_vector)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+
+query_embedding_cache = QueryEmbeddingCache(int(QUERY_EMBED_CACHE_MB * 1024 * 1024))
+
+
+def embed_query(text: str) -> List[float]:
+    """
+    Normalized vector for a search question, from the LRU cache when possible.
+
+    The text is lowercased and its whitespace collapsed first; the model's
+    tokenizer is uncased, so this changes the cache key, not the vector.
+    """
+    key = " ".join((text or "").lower().split())
+    vector = query_embedding_cache.get(key)
+    if vector is None:
+        vector = get_embeddings().embed_query(key)
+        query_embedding_cache.put(key, vector)
+    return vector
+
+
+def get_pdf_processor():
+    """Return the shared PDFProcessor (and with it the single open vector store)."""
+    global _pdf_processor
+    if _pdf_processor is None:
+        with _lock:
+            if _pdf_processor is None:
+                from utils.pdf_processor import PDFProcessor
+
+                _pdf_processor = PDFProcessor()
+    return _pdf_processor
+
+
+def record_vectorstore_open(seconds: float) -> None:
+    _metrics["vectorstore_open_seconds"] = round(seconds, 3)
+
+
+def warm_up() -> None:
+    """Load the model and open the vector store ahead of the first request."""
+    try:
+        get_embeddings()
+        get_pdf_processor()
+    except Exception as e:
+        print(f"⚠️  Embedding warm-up skipped: {e}")
+
+
+def registry_stats() -> Dict[str, Any]:
+    from utils.ann_index import VECTOR_ANN
+    from utils.vector_index import VECTOR_BACKEND
+
+    processor = _pdf_processor
+    total_seconds = _metrics["embed_seconds"]
+    return {
+        **_metrics,
+        "avg_chunks_per_sec": round(_metrics["chunks_embedded"] / total_seconds, 1) if total_seconds else None,
+        "vectorstore_open": bool(processor is not None and processor.has_knowledge_base()),
+        "vector_backend": VECTOR_BACKEND,
+        "vector_ann": VECTOR_ANN,
+        "query_cache": query_embedding_cache.stats(),
+    }
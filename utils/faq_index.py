@@ -0,0 +1,131 @@
+"""
+utils/faq_index.py
+===================
+In-memory ranked FAQ search.
+
+Matching a whole student sentence with an unanchored $regex over every
+FAQ field is a full collection scan on each chat request and almost
+never matches, so students mostly got whichever FAQs happened to share
+the category. This keeps every FAQ in a BM25 index (utils/bm25.py) in
+process memory and ranks them per query in microseconds:
+
+  - question and keywords count double, category and answer once
+  - FAQs in the query's category get a score boost
+  - with no term in common, FAQs of the category are returned as before
+
+The index is loaded from MongoDB on first use (or at API start-up),
+reloaded after every FAQ write in this process, and at least every
+FAQ_INDEX_REFRESH_SECONDS so edits made by other processes show up.
+database.mongo_db.search_faqs() falls back to the Mongo query if the
+index cannot be loaded.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.bm25 import BM25Index
+
+# Words that say nothing about which FAQ is meant
+STOPWORDS = {
+    "a", "about", "am", "an", "and", "any", "are", "at", "be", "can", "could", "do", "does",
+    "for", "from", "get", "have", "how", "i", "if", "in", "is", "it", "me", "my", "of", "on",
+    "or", "please", "should", "tell", "the", "there", "this", "to", "what", "when", "where",
+    "which", "who", "why", "will", "with", "would", "you", "your",
+}
+
+# Multiplier for FAQs whose category matches the query's
+CATEGORY_BOOST = 1.5
+
+
+def _faq_text(faq: Dict[str, Any]) -> str:
+    question = faq.get("question", "")
+    keywords = (faq.get("keywords", "") or "").replace(",", " ")
+    return " ".join([question, question, keywords, keywords, faq.get("category", ""), faq.get("answer", "")])
+
+
+def in_category(faq: Dict[str, Any], category: str) -> bool:
+    # Same rule as the old Mongo query: case-insensitive substring of the FAQ's category
+    return bool(category) and category.lower() in (faq.get("category", "") or "").lower()
+
+
+class FAQIndex:
+    """Thread-safe BM25 index over all FAQs, keyed by FAQ _id."""
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._bm25 = BM25Index(stopwords=STOPWORDS)
+        self._faqs: Dict[str, Dict[str, Any]] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.loads = 0
+        self.searches = 0
+        self.last_load_ms: Optional[float] = None
+
+    def is_stale(self) -> bool:
+        loaded_at = self._loaded_at
+        return loaded_at is None or time.monotonic() - loaded_at > self.refresh_seconds
+
+    def load(self, faqs: List[Dict[str, Any]]) -> None:
+        """Replace the index contents with these FAQ documents (_id already a string)."""
+        started = time.perf_counter()
+        bm25 = BM25Index(stopwords=STOPWORDS)
+        by_id = {}
+        for faq in faqs:
+            by_id[faq["_id"]] = faq
+            bm25.add(faq["_id"], _faq_text(faq))
+        with self._lock:
+            self._bm25 = bm25
+            self._faqs = by_id
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+            self.last_load_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    def ensure_loaded(self, loader: Callable[[], List[Dict[str, Any]]]) -> None:
+        """Load from loader() if never loaded or past the refresh interval."""
+        if self.is_stale():
+            with self._load_lock:
+                if self.is_stale():
+                    self.load(loader())
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._loaded_at = None
+
+    def search(self, query: str, category: str, k: int = 3) -> List[Dict[str, Any]]:
+        """Best-matching FAQs (copies), most relevant first."""
+        with self._lock:
+            bm25, faqs = self._bm25, self._faqs
+        self.searches += 1
+
+        scored = []
+        for faq_id, score in bm25.search(query, max(k * 4, 10)):
+            faq = faqs.get(faq_id)
+            if faq is None:
+                continue
+            if in_category(faq, category):
+                score *= CATEGORY_BOOST
+            scored.append((score, faq))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        results = [faq for _, faq in scored[:k]]
+
+        if not results:
+            results = [faq for faq in faqs.values() if in_category(faq, category)][:k]
+        return [dict(faq) for faq in results]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "faqs": len(self._faqs),
+            "loaded": self._loaded_at is not None,
+            "loads": self.loads,
+            "last_load_ms": self.last_load_ms,
+            "searches": self.searches,
+            "refresh_seconds": self.refresh_seconds,
+        }
+
+
+faq_index = FAQIndex(refresh_seconds=float(os.getenv("FAQ_INDEX_REFRESH_SECONDS", "300")))
@@ -0,0 +1,182 @@
+"""
+utils/ingestion_queue.py
+=========================
+Background PDF ingestion with pollable job status.
+
+Parsing, chunking and embedding a long handbook can take minutes, far
+longer than an admin upload request should stay open. The upload
+endpoint saves the file, calls submit() and returns a job id right
+away; a small thread pool (PDF_INGEST_WORKERS) runs
+PDFProcessor.process_pdf() and records progress on the job:
+
+    queued → running (stage: parsing → chunking → embedding) → succeeded / failed
+
+Job state is kept in memory for the last PDF_INGEST_JOB_HISTORY jobs of
+this process.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+from uuid import uuid4
+
+
+class IngestionQueue:
+    """Thread pool + in-memory job table for PDF ingestion."""
+
+    def __init__(self, max_workers: int, history: int):
+        self.max_workers = max(1, max_workers)
+        self.history = max(1, history)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="pdf-ingest")
+        return self._executor
+
+    def submit(
+        self,
+        save_path: str,
+        stored_filename: str,
+        original_name: str,
+        on_success: Callable[[Dict[str, Any], Dict[str, Any]], None],
+        on_failure: Optional[Callable[[Dict[str, Any], str], None]] = None,
+        content_hash: str = "",
+    ) -> Dict[str, Any]:
+        """
+        Queue one saved PDF for processing.
+
+        on_success(job, result) runs in the worker after process_pdf
+        succeeds (e.g. to record the upload in MongoDB); on_failure(job,
+        error) runs when it fails.
+        """
+        job = {
+            "id": uuid4().hex,
+            "filename": stored_filename,
+            "original_name": original_name,
+            "content_hash": content_hash,
+            "status": "queued",
+            "stage": "queued",
+            "pages_total": 0,
+            "pages_parsed": 0,
+            "chunks_total": 0,
+            "chunks_embedded": 0,
+            "error": "",
+            "result": None,
+            "created_at": datetime.now().isoformat(),
+            "started_at": "",
+            "finished_at": "",
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            while len(self._jobs) > self.history:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if oldest["status"] in {"queued", "running"}:
+                    break
+                self._jobs.pop(oldest_id)
+
+        self._get_executor().submit(self._run, job["id"], save_path, on_success, on_failure)
+        return dict(job)
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _run(
+        self,
+        job_id: str,
+        save_path: str,
+        on_success: Callable[[Dict[str, Any], Dict[str, Any]], None],
+        on_failure: Optional[Callable[[Dict[str, Any], str], None]],
+    ) -> None:
+        from utils.embeddings import get_pdf_processor
+
+        self._update(job_id, status="running", stage="parsing", started_at=datetime.now().isoformat())
+        job = self.get(job_id) or {}
+        try:
+            result = get_pdf_processor().process_pdf(
+                save_path,
+                job.get("original_name", ""),
+                progress=lambda **fields: self._update(job_id, **fields),
+            )
+        except Exception as e:
+            result = {"success": False, "error": str(e)}
+        chunk_ids = result.get("chunk_ids") or []
+
+        if result.get("success"):
+            try:
+                on_success(self.get(job_id) or job, result)
+            except Exception as e:
+                result = {"success": False, "error": f"PDF processed but could not be recorded: {e}"}
+            finally:
+                # The record now references the chunks (or never will)
+                get_pdf_processor().release_chunks(chunk_ids)
+
+        if result.get("success"):
+            self._update(
+                job_id,
+                status="succeeded",
+                stage="done",
+                result=result,
+                finished_at=datetime.now().isoformat(),
+            )
+            return
+
+        error = result.get("error", "PDF processing failed")
+        self._update(job_id, status="failed", stage="failed", error=error, finished_at=datetime.now().isoformat())
+        if on_failure is not None:
+            try:
+                on_failure(self.get(job_id) or job, error)
+            except Exception as e:
+                print(f"⚠️  PDF ingestion failure handler error: {e}")
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def find_active(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """A queued/running job for the same file contents, if any."""
+        if not content_hash:
+            return None
+        with self._lock:
+            for job in self._jobs.values():
+                if job["content_hash"] == content_hash and job["status"] in {"queued", "running"}:
+                    return dict(job)
+        return None
+
+    def list_jobs(self, limit: int = 50) -> list:
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values()]
+        return list(reversed(jobs))[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = [job["status"] for job in self._jobs.values()]
+        return {
+            "workers": self.max_workers,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "succeeded": statuses.count("succeeded"),
+            "failed": statuses.count("failed"),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+ingestion_queue = IngestionQueue(
+    max_workers=int(os.getenv("PDF_INGEST_WORKERS", "2")),
+    history=int(os.getenv("PDF_INGEST_JOB_HISTORY", "200")),
+)
@@ -0,0 +1,111 @@
+"""
+utils/llm_gate.py
+==================
+Admission control in front of the local LLM.
+
+Ollama only generates a couple of answers at a time on a normal machine,
+so letting every chat request hit it at once just makes everybody wait
+longer. The gate admits up to LLM_MAX_CONCURRENCY generations, lets up
+to LLM_MAX_QUEUE more wait their turn (for at most
+LLM_QUEUE_TIMEOUT_SECONDS), and sheds anything beyond that with
+LLMBusyError so the API can answer "busy, retry shortly" immediately.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+class LLMBusyError(Exception):
+    """Raised when the LLM queue is full or the wait for a slot timed out."""
+
+
+class LLMGate:
+    """Asyncio semaphore plus a bounded wait queue, with counters for monitoring."""
+
+    def __init__(self, max_concurrency: int, max_queue: int, queue_timeout: float):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.max_waiting_seen = 0
+        self.queue_admitted = 0
+        self.total_wait_seconds = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def is_saturated(self) -> bool:
+        """True when a new request would be shed right now."""
+        return self.active + self.waiting >= self.max_concurrency + self.max_queue
+
+    async def acquire(self) -> None:
+        if self.is_saturated():
+            self.shed += 1
+            raise LLMBusyError("The AI is busy answering other students. Please retry shortly.")
+
+        semaphore = self._get_semaphore()
+        if self.active + self.waiting < self.max_concurrency:
+            # A slot is free: Semaphore.acquire() returns without suspending.
+            await semaphore.acquire()
+        else:
+            started = time.perf_counter()
+            self.queued += 1
+            self.waiting += 1
+            self.max_waiting_seen = max(self.max_waiting_seen, self.waiting)
+            try:
+                await asyncio.wait_for(semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                raise LLMBusyError("Timed out waiting for the AI. Please retry shortly.") from None
+            finally:
+                self.waiting -= 1
+            self.queue_admitted += 1
+            self.total_wait_seconds += time.perf_counter() - started
+
+        self.active += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._get_semaphore().release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_queue_depth_seen": self.max_waiting_seen,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": self.shed,
+            "avg_queue_wait_ms": round(1000 * self.total_wait_seconds / self.queue_admitted, 1) if self.queue_admitted else 0.0,
+        }
+
+
+llm_gate = LLMGate(
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "2")),
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "32")),
+    queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "60")),
+)
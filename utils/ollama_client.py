@@ -0,0 +1,88 @@
+"""
+utils/ollama_client.py
+=======================
+Shared HTTP connection pools for every call we make to Ollama.
+
+Opening a new TCP connection per request costs a handshake each chat
+turn and, under bursts, leaves piles of sockets in TIME_WAIT. Instead
+the whole process keeps:
+  - one requests.Session (sync callers: start_llm, Streamlit pages)
+  - one httpx.AsyncClient (the async FastAPI chat endpoints)
+both with keep-alive pools of OLLAMA_POOL_SIZE connections.
+
+Timeouts are split: OLLAMA_CONNECT_TIMEOUT bounds how long we wait for
+Ollama to accept the connection (fails fast when it is not running),
+while each call passes its own read timeout (a health ping needs a few
+seconds, a generation can need minutes).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "3"))
+GENERATE_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "180"))
+POOL_SIZE = int(os.getenv("OLLAMA_POOL_SIZE", "10"))
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_async_client = None
+
+
+def request_timeout(read_timeout: float) -> tuple[float, float]:
+    """(connect, read) timeout tuple for requests calls."""
+    return (CONNECT_TIMEOUT, read_timeout)
+
+
+def async_timeout(read_timeout: float):
+    """httpx.Timeout with the shared connect timeout and a per-call read timeout."""
+    import httpx
+
+    return httpx.Timeout(read_timeout, connect=CONNECT_TIMEOUT, pool=CONNECT_TIMEOUT)
+
+
+def get_session() -> requests.Session:
+    """Process-wide keep-alive session for synchronous Ollama calls."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def get_async_client():
+    """Process-wide keep-alive httpx client for async Ollama calls."""
+    global _async_client
+    if _async_client is None:
+        import httpx
+
+        _async_client = httpx.AsyncClient(
+            timeout=async_timeout(GENERATE_READ_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=POOL_SIZE,
+                max_keepalive_connections=POOL_SIZE,
+                keepalive_expiry=60,
+            ),
+        )
+    return _async_client
+
+
+async def aclose_clients() -> None:
+    """Close both pools (called on API shutdown)."""
+    global _session, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _session is not None:
+        _session.close()
+        _session = None
@@ -0,0 +1,174 @@
+"""
+utils/password_pool.py
+=======================
+PBKDF2 password hashing and verification on every core.
+
+Each hash_password() / verify_password() call is 200,000 PBKDF2
+iterations — deliberately slow, ~100-200 ms of CPU. Two process pools
+keep that work off the API's request threads:
+
+  - hash_passwords() hands a list of passwords (student import) to a
+    shared pool of PASSWORD_HASH_PROCESSES workers in chunks and returns
+    the hashes in input order. Short lists are hashed in-process.
+
+  - password_verifier checks login passwords on its own pool of
+    PASSWORD_VERIFY_PROCESSES workers, so an import never delays logins.
+    At most PASSWORD_VERIFY_MAX_PENDING checks are admitted at once
+    (running or queued); beyond that verify() raises PasswordPoolBusy
+    right away, so a login storm at the start of term cannot tie up
+    every request thread and stall the chat endpoints.
+
+If a pool cannot be used (e.g. restricted environments) the work falls
+back to running in the calling thread.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import threading
+import time
+from typing import Any, Dict, List
+
+from database.mongo_db import _is_password_hash, hash_password, verify_password
+
+PASSWORD_HASH_PROCESSES = int(os.getenv("PASSWORD_HASH_PROCESSES", "0")) or (os.cpu_count() or 1)
+PASSWORD_HASH_MIN_PARALLEL = int(os.getenv("PASSWORD_HASH_MIN_PARALLEL", "8"))
+
+PASSWORD_VERIFY_PROCESSES = int(os.getenv("PASSWORD_VERIFY_PROCESSES", "0")) or (os.cpu_count() or 1)
+# Kept below the 40 threads FastAPI runs sync endpoints on, so waiting
+# logins always leave threads free for everything else
+PASSWORD_VERIFY_MAX_PENDING = int(os.getenv("PASSWORD_VERIFY_MAX_PENDING", "24"))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _mp_context():
+    # Pools start lazily in a process that already runs threads (and may have
+    # torch loaded); fork()ing it can deadlock the child, so spawn fresh workers
+    return multiprocessing.get_context("spawn")
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+
+                _pool = ProcessPoolExecutor(max_workers=PASSWORD_HASH_PROCESSES, mp_context=_mp_context())
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the worker processes of both pools (called on API shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+    password_verifier.shutdown()
+
+
+def _hash_plaintext(passwords: List[str]) -> List[str]:
+    if len(passwords) < PASSWORD_HASH_MIN_PARALLEL or PASSWORD_HASH_PROCESSES <= 1:
+        return [hash_password(password) for password in passwords]
+
+    # A few chunks per worker: few enough to keep IPC cheap, enough to even out the load
+    chunksize = max(1, len(passwords) // (PASSWORD_HASH_PROCESSES * 4))
+    try:
+        return list(_get_pool().map(hash_password, passwords, chunksize=chunksize))
+    except Exception as e:
+        print(f"⚠️  Parallel password hashing unavailable, hashing sequentially: {e}")
+        return [hash_password(password) for password in passwords]
+
+
+def hash_passwords(passwords: List[str]) -> List[str]:
+    """
+    hash_password() for every plain-text entry, in the same order.
+
+    Values that are already password hashes (e.g. an export re-imported)
+    are passed through unchanged, as the single-student upserts do.
+    """
+    plaintext = [password for password in passwords if not _is_password_hash(password)]
+    hashed = iter(_hash_plaintext(plaintext))
+    return [password if _is_password_hash(password) else next(hashed) for password in passwords]
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when PASSWORD_VERIFY_MAX_PENDING checks are already in flight."""
+
+
+class PasswordVerifier:
+    """verify_password() on a dedicated, admission-bounded process pool."""
+
+    def __init__(self, processes: int, max_pending: int):
+        self.processes = max(1, processes)
+        self.max_pending = max(1, max_pending)
+        self._pool = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.max_pending_seen = 0
+        self.verified = 0
+        self.shed = 0
+        self.fallbacks = 0
+        self.total_seconds = 0.0
+
+    def _get_pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    from concurrent.futures import ProcessPoolExecutor
+
+                    self._pool = ProcessPoolExecutor(max_workers=self.processes, mp_context=_mp_context())
+        return self._pool
+
+    def verify(self, password: str, stored_value: str) -> bool:
+        """Blocking check; raises PasswordPoolBusy instead of queueing past max_pending."""
+        if not _is_password_hash(stored_value):
+            # Legacy plain-text value: a constant-time compare, nothing to offload
+            return verify_password(password, stored_value)
+
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.shed += 1
+                raise PasswordPoolBusy("Too many sign-ins at once. Please retry in a few seconds.")
+            self.pending += 1
+            self.max_pending_seen = max(self.max_pending_seen, self.pending)
+
+        started = time.perf_counter()
+        try:
+            try:
+                return self._get_pool().submit(verify_password, password, stored_value).result()
+            except Exception as e:
+                self.fallbacks += 1
+                print(f"⚠️  Password verification pool unavailable, verifying in-thread: {e}")
+                return verify_password(password, stored_value)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.verified += 1
+                self.total_seconds += time.perf_counter() - started
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "processes": self.processes,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "queue_depth": max(0, self.pending - self.processes),
+            "max_pending_seen": self.max_pending_seen,
+            "verified": self.verified,
+            "shed": self.shed,
+            "fallbacks": self.fallbacks,
+            "avg_verify_ms": round(1000 * self.total_seconds / self.verified, 1) if self.verified else 0.0,
+        }
+
+
+password_verifier = PasswordVerifier(PASSWORD_VERIFY_PROCESSES, PASSWORD_VERIFY_MAX_PENDING)
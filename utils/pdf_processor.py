@@ -13,31 +13,68 @@ Libraries used:
 How PDF search works (RAG — Retrieval Augmented Generation):
   UPLOAD TIME:
     1. Admin uploads a PDF (e.g., college handbook)
-    2. PyPDFLoader reads all pages and extracts text
+    2. pypdf extracts the text of every page (in parallel for long PDFs,
+       see utils/pdf_text.py)
     3. Text is split into small chunks (500 chars each)
     4. Each chunk is converted to a vector using an embedding model
        (Think: similar meaning = similar vector numbers)
-    5. All vectors are stored in ChromaDB (a local database on your disk)
+    5. All vectors are stored in the vector index on your disk — ChromaDB,
+       or a memory-mapped NumPy matrix (VECTOR_BACKEND, see utils/vector_index.py)
 
   SEARCH TIME:
     1. Student asks a question
     2. Question is also converted to a vector
-    3. ChromaDB finds the stored chunks whose vectors are most similar
-    4. Those chunks (the most relevant text) are returned as context
-    5. The AI uses that context to answer the question
+    3. The index finds the stored chunks whose vectors are most similar
+    4. A BM25 keyword index finds the chunks sharing its exact words
+       (form and subject codes like "ATT-02"), and the two rankings are
+       fused (PDF_SEARCH_MODE, see utils/bm25.py)
+    5. Those chunks (the most relevant text) are returned as context
+    6. The AI uses that context to answer the question
 """
 
+import hashlib
 import os
+import threading
+import time
+from collections import Counter
+
+from utils.bm25 import BM25Index, reciprocal_rank_fusion
+from utils.embeddings import embed_documents, embed_query, get_embeddings, record_vectorstore_open
+from utils.pdf_text import iter_page_texts
+from utils.vector_index import VECTOR_BACKEND, open_index
 
 # Directories for storage
 PDF_STORAGE_DIR = "uploaded_pdfs"
 VECTOR_DB_DIR = "vector_db"
 
+# Files are hashed in 1MB reads
+HASH_READ_SIZE = 1024 * 1024
+
+# hybrid = BM25 + vector ranks fused with reciprocal rank fusion; vector = embeddings only
+PDF_SEARCH_MODE = os.getenv("PDF_SEARCH_MODE", "hybrid").strip().lower()
+# Each ranking contributes this many candidates per result asked for
+HYBRID_CANDIDATES_PER_RESULT = 4
+RRF_K = 60
+
 # Create directories if they don't exist
 os.makedirs(PDF_STORAGE_DIR, exist_ok=True)
 os.makedirs(VECTOR_DB_DIR, exist_ok=True)
 
 
+def file_sha256(path: str) -> str:
+    """SHA-256 of a file on disk (identical uploads hash the same whatever their name)."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(text: str) -> str:
+    """Vector store id of a chunk: SHA-256 of its text, so identical chunks are stored once."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 class PDFProcessor:
     """
     Processes PDF documents and enables semantic (meaning-based) search.
@@ -47,74 +84,86 @@ class PDFProcessor:
     - Free and open-source
     - Downloads automatically on first use (~90MB)
     - Converts text to 384-dimensional vectors
+
+    Use utils.embeddings.get_pdf_processor() rather than constructing
+    this class directly, so the whole process shares one vector store.
     """
 
     def __init__(self):
-        self.vectorstore = None
-        self._try_load_existing_vectorstore()
-
-    def _try_load_existing_vectorstore(self):
+        self.index = None
+        # Several ingestion jobs may run at once; index writes go one at a time
+        self._write_lock = threading.Lock()
+        # Chunk ids that ingestions in progress rely on, until their PDF record
+        # exists (release_chunks); remove_document() never deletes these
+        self._claimed = Counter()
+        # Keyword index over the same chunks, built from the vector index on first search
+        self._bm25 = None
+        self._bm25_lock = threading.Lock()
+        self._try_load_existing_index()
+
+    def _try_load_existing_index(self):
         """
-        On startup, try to load a previously saved vector database.
+        On startup, try to load a previously saved vector index.
         If PDFs were uploaded before, we can use them right away.
         """
-        # Only try if the vector_db folder has content
-        if not os.path.exists(VECTOR_DB_DIR):
-            return
-        if not os.listdir(VECTOR_DB_DIR):
-            return
-
         try:
-            from langchain_community.vectorstores import Chroma
-            from langchain_community.embeddings import HuggingFaceEmbeddings
-
-            print("📂 Loading existing PDF knowledge base from disk...")
-
-            embeddings = HuggingFaceEmbeddings(
-                model_name="all-MiniLM-L6-v2",
-                model_kwargs={"device": "cpu"},
-                encode_kwargs={"normalize_embeddings": True}
-            )
+            started = time.perf_counter()
+            self.index = open_index(VECTOR_DB_DIR)
+            if self.index is None:
+                return
 
-            self.vectorstore = Chroma(
-                persist_directory=VECTOR_DB_DIR,
-                embedding_function=embeddings
-            )
-            print("✅ PDF knowledge base loaded successfully")
+            print(f"📂 Loaded existing PDF knowledge base from disk ({VECTOR_BACKEND})")
+            record_vectorstore_open(time.perf_counter() - started)
 
         except ImportError as e:
-            print(f"⚠️  LangChain libraries not installed: {e}")
+            print(f"⚠️  Vector index libraries not installed: {e}")
             print("   Run: pip install langchain langchain-community chromadb sentence-transformers pypdf")
         except Exception as e:
             print(f"⚠️  Could not load existing vector DB: {e}")
 
-    def process_pdf(self, pdf_file_path: str, filename: str) -> dict:
+    def process_pdf(self, pdf_file_path: str, filename: str, progress=None) -> dict:
         """
-        Read a PDF, extract text, create embeddings, store in ChromaDB.
+        Read a PDF, extract text, create embeddings, store in the vector index.
 
         Parameters:
             pdf_file_path (str): Full path to the saved PDF file
             filename      (str): Original filename for tracking
+            progress (callable): Optional progress(**fields) hook, called with
+                                 stage / pages_total / pages_parsed /
+                                 chunks_total / chunks_embedded as work advances
 
         Returns:
             dict: {
                 "success": True/False,
                 "pages": number of pages read,
                 "chunks": number of text chunks created,
+                "chunks_new": chunks that were not in the vector store yet,
+                "chunk_ids": ids of every chunk of this PDF,
+                "content_hash": SHA-256 of the file,
                 "filename": filename,
                 "error": error message (only if success=False)
             }
+
+        On success the chunk ids stay claimed until the caller has saved the
+        PDF record and called release_chunks(result["chunk_ids"]).
         """
+        report = progress or (lambda **fields: None)
+        claimed = []
+
         try:
-            from langchain_community.document_loaders import PyPDFLoader
+            from langchain_core.documents import Document
             from langchain.text_splitter import RecursiveCharacterTextSplitter
-            from langchain_community.vectorstores import Chroma
-            from langchain_community.embeddings import HuggingFaceEmbeddings
 
             # ---- Step 1: Load PDF ----
+            # One Document per page, same metadata PyPDFLoader used to give
             print(f"📖 Reading PDF: {filename}")
-            loader = PyPDFLoader(pdf_file_path)
-            pages = loader.load()
+            pages = [
+                Document(page_content=text, metadata={"source": pdf_file_path, "page": index})
+                for index, text in iter_page_texts(
+                    pdf_file_path,
+                    progress=lambda done, total: report(pages_total=total, pages_parsed=done),
+                )
+            ]
 
             if not pages:
                 return {
@@ -123,6 +172,7 @@ class PDFProcessor:
                 }
 
             print(f"   → Extracted text from {len(pages)} pages")
+            report(stage="chunking", pages_total=len(pages), pages_parsed=len(pages))
 
             # ---- Step 2: Split into Chunks ----
             # Why chunks? LLMs have token limits.
@@ -145,56 +195,210 @@ class PDFProcessor:
             for chunk in chunks:
                 chunk.metadata["source_file"] = filename
 
-            print(f"   → Split into {len(chunks)} searchable chunks")
+            # ---- Dedupe: identical text = identical id ----
+            # Repeated headers/footers inside this PDF, and chunks another
+            # upload already stored (same timetable under a new name), are
+            # neither embedded nor stored again.
+            chunk_ids = [chunk_id(chunk.page_content) for chunk in chunks]
+            unique = {}
+            for cid, chunk in zip(chunk_ids, chunks):
+                unique.setdefault(cid, chunk)
+            with self._write_lock:
+                self._claimed.update(unique)
+            claimed = list(unique)
+            existing = self._existing_ids(claimed)
+            new_chunks = [(cid, chunk) for cid, chunk in unique.items() if cid not in existing]
+
+            print(f"   → Split into {len(chunks)} searchable chunks ({len(new_chunks)} new)")
+            report(stage="embedding", chunks_total=len(new_chunks), chunks_embedded=0)
 
             # ---- Step 3: Create Embeddings ----
             # The embedding model converts text to numbers (vectors)
             # so we can do mathematical similarity comparison.
+            # Done in batches (all cores, optionally several processes —
+            # see utils/embeddings.py) and outside the write lock, so two
+            # uploads can embed at the same time.
             print("   → Creating text embeddings (this may take a moment)...")
-            embeddings = HuggingFaceEmbeddings(
-                model_name="all-MiniLM-L6-v2",
-                model_kwargs={"device": "cpu"},
-                encode_kwargs={"normalize_embeddings": True}
-            )
-
-            # ---- Step 4: Store in ChromaDB ----
-            if self.vectorstore is None:
-                # First PDF — create a new vector database
-                self.vectorstore = Chroma.from_documents(
-                    documents=chunks,
-                    embedding=embeddings,
-                    persist_directory=VECTOR_DB_DIR
-                )
-            else:
-                # Additional PDF — add to existing database
-                self.vectorstore.add_documents(chunks)
-
-            # Save to disk (persists between app restarts)
-            self.vectorstore.persist()
+            texts = [chunk.page_content for _, chunk in new_chunks]
+            get_embeddings()  # load the shared model first so throughput isn't skewed by it
+            started = time.perf_counter()
+            vectors = embed_documents(texts, progress=lambda done: report(chunks_embedded=done))
+            embed_seconds = time.perf_counter() - started
+            chunks_per_sec = len(texts) / embed_seconds if embed_seconds > 0 else 0.0
+            if texts:
+                print(f"   → Embedded {len(texts)} chunks in {embed_seconds:.1f}s ({chunks_per_sec:.1f} chunks/sec)")
+
+            # ---- Step 4: Store in the vector index ----
+            report(stage="storing")
+            with self._write_lock:
+                if self.index is None:
+                    # First PDF — create a new vector index
+                    self.index = open_index(VECTOR_DB_DIR, create=True)
+                ids = [cid for cid, _ in new_chunks]
+                metadatas = [dict(chunk.metadata) for _, chunk in new_chunks]
+                # Vectors are already computed, so write them straight to the index
+                self.index.upsert(ids, vectors, metadatas, texts)
+                if self._bm25 is not None:
+                    self._bm25.add_many(zip(ids, texts))
+
+                # Save to disk (persists between app restarts)
+                self.index.persist()
 
             print(f"✅ PDF '{filename}' processed successfully!")
             return {
                 "success": True,
                 "pages": len(pages),
                 "chunks": len(chunks),
-                "filename": filename
+                "chunks_new": len(new_chunks),
+                "chunk_ids": list(unique),
+                "content_hash": file_sha256(pdf_file_path),
+                "filename": filename,
+                "embed_seconds": round(embed_seconds, 2),
+                "chunks_per_sec": round(chunks_per_sec, 1)
             }
 
         except ImportError as e:
             msg = f"Missing library: {e}. Run: pip install langchain langchain-community chromadb sentence-transformers pypdf"
             print(f"❌ {msg}")
+            self.release_chunks(claimed)
             return {"success": False, "error": msg}
 
         except Exception as e:
             print(f"❌ PDF processing error: {e}")
+            self.release_chunks(claimed)
             return {"success": False, "error": str(e)}
 
+    def release_chunks(self, chunk_ids: list) -> None:
+        """
+        End process_pdf()'s claim on these chunk ids.
+
+        Call once the upload's PDF record (with its chunk_ids) is saved, or
+        when it will not be; until then remove_document() keeps the chunks.
+        """
+        with self._write_lock:
+            self._claimed.subtract(chunk_ids)
+            self._claimed += Counter()  # drop ids no longer claimed
+
+    def _existing_ids(self, ids: list) -> set:
+        """Which of these chunk ids are already in the vector index."""
+        if self.index is None or not ids:
+            return set()
+        return self.index.existing_ids(ids)
+
+    def remove_document(self, record: dict, keep=()) -> int:
+        """
+        Drop a deleted (or replaced) PDF's chunks from the vector index.
+
+        Call after its Mongo record is gone. Chunk ids are content hashes
+        shared between PDFs, so ids another record still references, ids
+        an ingestion in progress has claimed, and ids in keep (e.g. the
+        chunks of the upload replacing this PDF) are kept. Records from
+        before chunk ids were tracked are matched by their source_file
+        metadata instead.
+
+        Kept chunks that were first stored for this PDF still name it as
+        their source; they are relabelled with a PDF that still uses them.
+
+        Returns:
+            int: number of chunks removed
+        """
+        if self.index is None:
+            return 0
+
+        from database.mongo_db import get_chunk_ids_in_use, get_chunk_owner_names
+
+        chunk_ids = list(record.get("chunk_ids") or [])
+        keep = set(keep)
+        with self._write_lock:
+            if not chunk_ids:
+                # Labelled with the stored filename or the original name, depending on the upload path
+                names = {record.get("filename"), record.get("original_name")} - {None, ""}
+                if not names:
+                    return 0
+                chunk_ids = list(dict.fromkeys(cid for name in sorted(names) for cid in self.index.ids_for_source(name)))
+            in_use = get_chunk_ids_in_use(chunk_ids)
+            protected = in_use | keep | set(self._claimed)
+            stale = [cid for cid in chunk_ids if cid not in protected]
+
+            if stale:
+                self.index.delete(stale)
+                if self._bm25 is not None:
+                    for cid in stale:
+                        self._bm25.remove(cid)
+
+            relabelled = self._relabel_source(record, [cid for cid in chunk_ids if cid in in_use], get_chunk_owner_names)
+
+            if stale or relabelled:
+                self.index.persist()
+
+        print(f"🗑️  Removed {len(stale)} chunks of '{record.get('filename', '')}' from the PDF knowledge base")
+        return len(stale)
+
+    def _relabel_source(self, record: dict, chunk_ids: list, owner_names) -> int:
+        """Point surviving chunks labelled with a removed PDF at a PDF that still has them."""
+        names = {record.get("filename"), record.get("original_name")} - {None, ""}
+        labelled = [
+            (cid, metadata) for cid, _, metadata in self.index.get(chunk_ids)
+            if metadata.get("source_file") in names
+        ]
+        if not labelled:
+            return 0
+        owners = owner_names([cid for cid, _ in labelled])
+        ids, metadatas = [], []
+        for cid, metadata in labelled:
+            if owners.get(cid):
+                ids.append(cid)
+                metadatas.append({**metadata, "source_file": owners[cid]})
+        self.index.update_metadata(ids, metadatas)
+        return len(ids)
+
+    def compact(self, live_ids: set, legacy_names: set, tracked_names: set) -> dict:
+        """
+        Rebuild the vector index without chunks PDF records no longer use.
+
+        Deleted vectors are not reclaimed (Chroma keeps their space, NumPy
+        leaves tombstones), and chunks orphaned before deletes were tracked
+        are never removed, so the index only grows. A chunk is dropped only
+        when it is labelled with a PDF record that tracks its chunk ids and
+        no record lists it. Chunks referenced by id, labelled with a
+        legacy (untracked) record, claimed by an ingestion in progress, or
+        not attributable to any record are kept; the last kind is counted
+        in "unowned" for the admin to look at rather than deleted blind.
+
+        Returns:
+            dict: {"before", "after", "removed", "unowned"} chunk counts
+        """
+        if self.index is None:
+            return {"before": 0, "after": 0, "removed": 0, "unowned": 0}
+
+        unowned = Counter()
+
+        def keep(cid, metadata):
+            source = metadata.get("source_file")
+            if cid in live_ids or cid in self._claimed or source in legacy_names:
+                return True
+            if source in tracked_names:
+                return False
+            unowned[source or ""] += 1
+            return True
+
+        with self._write_lock:
+            before, after = self.index.compact(keep)
+            self._bm25 = None  # rebuilt from the compacted index on the next search
+
+        if unowned:
+            print(f"⚠️  Kept {sum(unowned.values())} chunks no PDF record owns: {dict(unowned.most_common(10))}")
+        print(f"🧹 Compacted PDF knowledge base: {before} → {after} chunks")
+        return {"before": before, "after": after, "removed": before - after, "unowned": sum(unowned.values())}
+
     def search(self, query: str, num_results: int = 3) -> str:
         """
-        Search the vector database for content relevant to the query.
+        Search the vector index for content relevant to the query.
 
         Uses cosine similarity — finds stored text chunks whose
-        meaning (vector) is most similar to the query's meaning.
+        meaning (vector) is most similar to the query's meaning — and, in
+        hybrid mode, fuses that ranking with BM25 keyword matches so exact
+        codes like "ATT-02" are not missed.
 
         Parameters:
             query       (str): The student's question
@@ -203,20 +407,26 @@ class PDFProcessor:
         Returns:
             str: Most relevant text chunks combined, or "" if nothing found
         """
-        if self.vectorstore is None:
+        if self.index is None:
             return ""  # No PDFs have been uploaded yet
 
         try:
-            docs = self.vectorstore.similarity_search(query, k=num_results)
+            if PDF_SEARCH_MODE == "hybrid":
+                chunks = self._hybrid_search(query, num_results)
+            else:
+                chunks = [
+                    (text, metadata)
+                    for _, text, metadata, _ in self.index.query(embed_query(query), num_results)
+                ]
 
-            if not docs:
+            if not chunks:
                 return ""
 
             # Combine results, showing which file each came from
             results = []
-            for doc in docs:
-                source = doc.metadata.get("source_file", "College Document")
-                results.append(f"[Source: {source}]\n{doc.page_content}")
+            for text, metadata in chunks:
+                source = metadata.get("source_file", "College Document")
+                results.append(f"[Source: {source}]\n{text}")
 
             return "\n\n".join(results)
 
@@ -224,6 +434,37 @@ class PDFProcessor:
             print(f"⚠️  PDF search error: {e}")
             return ""
 
+    def _hybrid_search(self, query: str, num_results: int) -> list:
+        """Vector and BM25 rankings fused by reciprocal rank; returns [(text, metadata)]."""
+        candidates = num_results * HYBRID_CANDIDATES_PER_RESULT
+        vector_hits = self.index.query(embed_query(query), candidates)
+        keyword_hits = self._get_bm25().search(query, candidates)
+
+        ranked = reciprocal_rank_fusion(
+            [[cid for cid, _, _, _ in vector_hits], [cid for cid, _ in keyword_hits]],
+            k=RRF_K,
+        )[:num_results]
+
+        chunks = {cid: (text, metadata) for cid, text, metadata, _ in vector_hits}
+        missing = [cid for cid in ranked if cid not in chunks]
+        if missing:
+            chunks.update({cid: (text, metadata) for cid, text, metadata in self.index.get(missing)})
+        return [chunks[cid] for cid in ranked if cid in chunks]
+
+    def _get_bm25(self) -> BM25Index:
+        """The keyword index, built from every chunk in the vector index on first use."""
+        if self._bm25 is None:
+            with self._bm25_lock:
+                if self._bm25 is None:
+                    started = time.perf_counter()
+                    bm25 = BM25Index()
+                    # Under the write lock so no upload lands between the scan and the swap
+                    with self._write_lock:
+                        bm25.add_many((cid, text) for cid, text, _ in self.index.iter_documents())
+                        self._bm25 = bm25
+                    print(f"🔎 Built PDF keyword index: {len(bm25)} chunks in {time.perf_counter() - started:.1f}s")
+        return self._bm25
+
     def get_uploaded_files(self) -> list:
         """Return list of PDF files in the upload directory."""
         if not os.path.exists(PDF_STORAGE_DIR):
@@ -232,4 +473,4 @@ class PDFProcessor:
 
     def has_knowledge_base(self) -> bool:
         """Check if any PDFs have been processed into the vector database."""
-        return self.vectorstore is not None
\ No newline at end of file
+        return self.index is not None
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""
+utils/pdf_text.py
+==================
+Page-parallel text extraction for PDFs.
+
+pypdf parses pages one after another on a single core, so a few hundred
+pages of circulars or enrollment lists take a long time before chunking
+(PDF uploads) or record parsing (student import) can even start. Both
+callers go through iter_page_texts() instead:
+
+  - small PDFs (< PDF_EXTRACT_MIN_PAGES pages) are read in-process
+  - larger ones are cut into ranges of PDF_EXTRACT_PAGES_PER_TASK pages
+    and handed to a shared process pool (PDF_EXTRACT_PROCESSES workers),
+    each worker opening its own PdfReader for its range. Workers get the
+    file path (PDF bytes are written to a temporary file once), not the
+    bytes, and are spawned fresh: the API process runs threads and has
+    torch loaded, which a fork()ed worker can deadlock on.
+
+Ranges come back in page order as soon as each one is ready, so callers
+can report progress while later pages are still being parsed. If the
+pool cannot be used (e.g. restricted environments) extraction falls back
+to reading the pages sequentially.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import tempfile
+import threading
+from io import BytesIO
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+
+PDF_EXTRACT_PROCESSES = int(os.getenv("PDF_EXTRACT_PROCESSES", "0")) or (os.cpu_count() or 1)
+PDF_EXTRACT_MIN_PAGES = int(os.getenv("PDF_EXTRACT_MIN_PAGES", "40"))
+PDF_EXTRACT_PAGES_PER_TASK = int(os.getenv("PDF_EXTRACT_PAGES_PER_TASK", "16"))
+
+PdfSource = Union[str, bytes]
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _open_reader(source: PdfSource):
+    from pypdf import PdfReader
+
+    return PdfReader(BytesIO(source) if isinstance(source, bytes) else source)
+
+
+def _extract_range(source: PdfSource, start: int, end: int) -> List[str]:
+    """Worker: text of pages [start, end) of one PDF."""
+    reader = _open_reader(source)
+    return [reader.pages[index].extract_text() or "" for index in range(start, end)]
+
+
+def _get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+
+                _pool = ProcessPoolExecutor(
+                    max_workers=PDF_EXTRACT_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+                )
+    return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the worker processes (called on API shutdown)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def iter_page_texts(
+    source: PdfSource,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Iterator[Tuple[int, str]]:
+    """
+    Yield (page_index, text) for every page, in order.
+
+    Parameters:
+        source   (str | bytes): Path to the PDF, or its raw bytes
+        progress (callable):    Optional progress(pages_done, pages_total) hook
+
+    Empty / image-only pages yield "".
+    """
+    reader = _open_reader(source)
+    total = len(reader.pages)
+    report = progress or (lambda done, total: None)
+    report(0, total)
+
+    if total < PDF_EXTRACT_MIN_PAGES or PDF_EXTRACT_PROCESSES <= 1:
+        for index, page in enumerate(reader.pages):
+            yield index, page.extract_text() or ""
+            report(index + 1, total)
+        return
+
+    step = max(1, PDF_EXTRACT_PAGES_PER_TASK)
+    ranges = [(start, min(start + step, total)) for start in range(0, total, step)]
+    done = 0
+    temp_path = None
+    try:
+        try:
+            if isinstance(source, bytes):
+                # One file write instead of pickling the whole PDF into every task
+                with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+                    f.write(source)
+                    temp_path = f.name
+            pool = _get_pool()
+            futures = [pool.submit(_extract_range, temp_path or source, start, end) for start, end in ranges]
+        except Exception as e:
+            print(f"⚠️  Parallel PDF extraction unavailable, reading pages sequentially: {e}")
+            futures = []
+
+        for (start, end), future in zip(ranges, futures):
+            try:
+                texts = future.result()
+            except Exception as e:
+                print(f"⚠️  PDF page worker failed ({e}); continuing sequentially")
+                for pending in futures:
+                    pending.cancel()
+                break
+            for offset, text in enumerate(texts):
+                yield start + offset, text
+            done = end
+            report(done, total)
+    finally:
+        if temp_path is not None:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    # Whatever the pool did not deliver is read here, in order
+    for index in range(done, total):
+        yield index, reader.pages[index].extract_text() or ""
+        report(index + 1, total)
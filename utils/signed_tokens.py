@@ -0,0 +1,171 @@
+"""
+utils/signed_tokens.py
+=======================
+Stateless HMAC-signed session tokens (AUTH_TOKEN_MODE=signed).
+
+Instead of a random id looked up in a session store, the token carries
+its own claims — the session data, issue time, expiry and a random id
+(jti) — followed by an HMAC-SHA256 over them with AUTH_TOKEN_SECRET:
+
+    base64url(json claims) "." base64url(hmac)
+
+Validation is one HMAC and a JSON decode, with no shared state, so any
+number of API workers that share the secret accept each other's tokens.
+The one thing a signature cannot express is "no longer valid", so a
+small revocation list covers that:
+
+  - logout revokes one token (by jti) until it would have expired anyway
+  - a password change revokes every older token of that student
+
+Revocations live in a SESSION_BACKEND store (utils/token_store.py), so
+they reach every worker when that backend is shared. With a shared
+backend, a "not revoked" answer is remembered per token for
+SESSION_CACHE_SECONDS, so a revocation can take that long to reach the
+other workers.
+
+SignedTokens has the same issue() / get() / remove() / stats() methods
+as the token stores, so the API uses either one the same way.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from utils.token_store import SESSION_BACKEND, SESSION_CACHE_SECONDS, TokenStore, open_token_store
+
+AUTH_TOKEN_MODE = os.getenv("AUTH_TOKEN_MODE", "session").strip().lower()
+AUTH_TOKEN_SECRET = os.getenv("AUTH_TOKEN_SECRET", "")
+
+# Subject-wide revocations outlive every token they can apply to
+REVOKE_SUBJECT_SECONDS = 7 * 24 * 3600
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+class SignedTokens:
+    """Self-expiring signed tokens for one kind of session ("admin", "student")."""
+
+    def __init__(self, name: str, subject_field: str, secret: bytes, backend: str = SESSION_BACKEND):
+        self.name = name
+        self.subject_field = subject_field
+        self._secret = secret
+        self._revoked = open_token_store(f"{name}-revoked", backend)
+        # Shared revocation stores are asked once per token per SESSION_CACHE_SECONDS
+        self._not_revoked = TokenStore(f"{name}-not-revoked") if backend != "memory" else None
+        self.issued = 0
+        self.verified = 0
+        self.rejected = 0
+        self.revocations = 0
+
+    def _sign(self, body: str) -> str:
+        # The session kind is part of the MAC, so a student token never passes as an admin one
+        message = f"{self.name}.{body}".encode("ascii")
+        return _b64encode(hmac.new(self._secret, message, hashlib.sha256).digest())
+
+    def issue(self, data: Dict[str, Any], ttl_seconds: float) -> Tuple[str, datetime]:
+        now = time.time()
+        claims = {**data, "iat": now, "exp": now + ttl_seconds, "jti": secrets.token_urlsafe(12)}
+        body = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        self.issued += 1
+        return f"{body}.{self._sign(body)}", datetime.fromtimestamp(claims["exp"])
+
+    def _claims(self, token: str) -> Optional[Dict[str, Any]]:
+        """Signature-checked, unexpired claims, or None."""
+        if not isinstance(token, str) or not token.isascii():
+            # Never issued by us; also keeps _sign() and compare_digest() on ASCII
+            return None
+        body, _, signature = token.partition(".")
+        if not body or not signature or not hmac.compare_digest(signature, self._sign(body)):
+            return None
+        try:
+            claims = json.loads(_b64decode(body))
+        except ValueError:
+            return None
+        if not isinstance(claims, dict) or float(claims.get("exp", 0)) <= time.time():
+            return None
+        return claims
+
+    def _is_revoked(self, claims: Dict[str, Any]) -> bool:
+        jti = claims["jti"]
+        if self._not_revoked is not None and self._not_revoked.get(jti) is not None:
+            return False
+        if self._revoked.get(f"jti:{jti}") is not None:
+            return True
+        subject = self._revoked.get(f"sub:{claims.get(self.subject_field, '')}")
+        if subject is not None and claims["iat"] < subject["before"]:
+            return True
+        if self._not_revoked is not None:
+            self._not_revoked.add(jti, {}, min(claims["exp"], time.time() + SESSION_CACHE_SECONDS))
+        return False
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """The session data carried by a valid token (plus "expires_at"), or None."""
+        claims = self._claims(token)
+        if claims is None or self._is_revoked(claims):
+            self.rejected += 1
+            return None
+        self.verified += 1
+        data = {key: value for key, value in claims.items() if key not in ("exp", "jti")}
+        data["expires_at"] = datetime.fromtimestamp(claims["exp"]).isoformat()
+        return data
+
+    def remove(self, token: str) -> bool:
+        """Revoke one token (logout) until its own expiry."""
+        claims = self._claims(token)
+        if claims is None:
+            return False
+        self._revoked.add(f"jti:{claims['jti']}", {}, claims["exp"])
+        if self._not_revoked is not None:
+            self._not_revoked.remove(claims["jti"])
+        self.revocations += 1
+        return True
+
+    def revoke_subject(self, subject: str, before: Optional[float] = None) -> None:
+        """Revoke every token of this subject issued before the epoch time before (default now)."""
+        before = time.time() if before is None else before
+        self._revoked.add(f"sub:{subject}", {"before": before}, time.time() + REVOKE_SUBJECT_SECONDS)
+        self.revocations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "signed",
+            "revocation_backend": self._revoked.stats().get("backend"),
+            "issued": self.issued,
+            "verified": self.verified,
+            "rejected": self.rejected,
+            "revocations": self.revocations,
+        }
+
+
+def _secret() -> bytes:
+    if AUTH_TOKEN_SECRET:
+        return AUTH_TOKEN_SECRET.encode("utf-8")
+    print("⚠️  AUTH_TOKEN_SECRET is not set: signed tokens will not survive a restart or work across workers")
+    return secrets.token_bytes(32)
+
+
+_signing_secret: Optional[bytes] = None
+
+
+def open_auth_tokens(name: str, subject_field: str):
+    """The AUTH_TOKEN_MODE token source for one kind of session."""
+    global _signing_secret
+    if AUTH_TOKEN_MODE == "signed":
+        if _signing_secret is None:
+            _signing_secret = _secret()
+        return SignedTokens(name, subject_field, _signing_secret)
+    return open_token_store(name)
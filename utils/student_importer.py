@@ -1,17 +1,23 @@
 from __future__ import annotations
 
 import csv
+import os
 import re
+import time
 from collections import Counter
 from io import BytesIO, StringIO
 from typing import Any
 
 import pandas as pd
-from pypdf import PdfReader
+
+from utils.pdf_text import iter_page_texts
 
 
 ENROLLMENT_RE = re.compile(r"\b\d{8,16}\b")
 
+# Rows per bulk_write during import; passwords are hashed a batch at a time
+STUDENT_IMPORT_BATCH_SIZE = int(os.getenv("STUDENT_IMPORT_BATCH_SIZE", "500"))
+
 
 def _normalize_header(value: Any) -> str:
     text = str(value or "").strip().lower()
@@ -83,11 +89,9 @@ def _extract_name_from_pdf_line(line: str) -> str:
 
 
 def _read_pdf_records(content: bytes) -> list[dict[str, Any]]:
-    reader = PdfReader(BytesIO(content))
     records: list[dict[str, Any]] = []
 
-    for page in reader.pages:
-        text = page.extract_text() or ""
+    for _, text in iter_page_texts(content):
         for raw_line in text.splitlines():
             line = _clean_text(raw_line)
             if not line or line.lower().startswith("sr."):
@@ -215,3 +219,39 @@ def parse_student_file(filename: str, content: bytes, default_password: str) ->
     students, summary = normalize_student_records(raw_records, default_password)
     summary["source_file"] = filename
     return students, summary
+
+
+def import_students(students: list[dict[str, Any]], batch_size: int = STUDENT_IMPORT_BATCH_SIZE) -> dict[str, Any]:
+    """Hash passwords on all cores and upsert students in bulk_write batches."""
+    from database.mongo_db import bulk_upsert_students
+    from utils.password_pool import hash_passwords
+
+    started = time.perf_counter()
+    batch_size = max(1, batch_size)
+    imported = 0
+    batches: list[dict[str, Any]] = []
+    for number, start in enumerate(range(0, len(students), batch_size), start=1):
+        batch = students[start:start + batch_size]
+        hashed = hash_passwords([student["password"] for student in batch])
+        rows = [{**student, "password": password} for student, password in zip(batch, hashed)]
+        result = bulk_upsert_students(rows)
+        imported += result["written"]
+        batches.append(
+            {
+                "batch": number,
+                "rows": len(batch),
+                "written": result["written"],
+                "inserted": result["inserted"],
+                "updated": result["updated"],
+                "errors": result["errors"],
+            }
+        )
+
+    elapsed = time.perf_counter() - started
+    return {
+        "imported_count": imported,
+        "failed_count": sum(len(batch["errors"]) for batch in batches),
+        "elapsed_seconds": round(elapsed, 2),
+        "rows_per_second": round(len(students) / elapsed, 1) if elapsed > 0 else 0.0,
+        "batches": batches,
+    }
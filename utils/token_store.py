@@ -0,0 +1,342 @@
+"""
+utils/token_store.py
+=====================
+Session token stores: O(1) validation, amortised expiry, optionally
+shared between API worker processes.
+
+The API used to keep tokens in plain dicts with ISO-string expiries and
+scan every session, parsing each timestamp, on every authenticated
+request — so auth cost grew with the number of logged-in students.
+TokenStore keeps, per token, its data plus a precomputed epoch expiry,
+and a min-heap of (expiry, token):
+
+  - get() is one dict lookup and one float comparison; an expired entry
+    found this way is dropped on the spot
+  - add() and get() pop at most SWEEP_BATCH already-expired entries off
+    the top of the heap, so cleanup is spread over requests instead of
+    being a full scan
+  - remove() only deletes the dict entry; its heap entry is skipped when
+    it surfaces (each heap entry carries the expiry it was pushed with),
+    and once such stale entries outnumber the live ones the heap is
+    rebuilt, so logouts cannot pile them up
+
+TokenStore only lives in one process, so with several uvicorn workers
+(or nodes) a student logged in on one worker is unknown to the others.
+SESSION_BACKEND picks a store every worker shares:
+
+  - "memory"  TokenStore, the default (single worker)
+  - "sqlite"  SQLiteTokenStore: one WAL-mode SQLite file
+              (SESSION_SQLITE_PATH) for all workers on one machine
+  - "mongo"   MongoTokenStore: the "sessions" collection, with a TTL
+              index on expires_at (database/indexes.py) doing the cleanup
+              and a per-process read-through cache of
+              SESSION_CACHE_SECONDS in front of it, for several machines
+
+The shared stores key sessions by the SHA-256 of the token, so the raw
+bearer tokens never sit in a file or database. open_token_store() builds
+the configured one.
+
+Benchmark against the old full scan: python -m utils.bench_token_store
+"""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import os
+import secrets
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory").strip().lower()
+SESSION_SQLITE_PATH = os.getenv("SESSION_SQLITE_PATH", "sessions.db")
+SESSION_CACHE_SECONDS = float(os.getenv("SESSION_CACHE_SECONDS", "30"))
+
+# Expired entries reclaimed per add()/get(); enough to keep up with any login rate
+SWEEP_BATCH = 16
+
+# Shared stores delete expired rows at most this often per process
+SHARED_PURGE_SECONDS = 60
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def _new_token(data: Dict[str, Any], ttl_seconds: float) -> Tuple[str, float, Dict[str, Any]]:
+    """Random token, its epoch expiry, and data with an ISO "expires_at" added."""
+    expires_at = time.time() + ttl_seconds
+    return secrets.token_urlsafe(32), expires_at, {**data, "expires_at": datetime.fromtimestamp(expires_at).isoformat()}
+
+
+class TokenStore:
+    """Thread-safe token → data map with per-token expiry."""
+
+    def __init__(self, name: str = "tokens"):
+        self.name = name
+        self._entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self.issued = 0
+        self.expired = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _sweep(self, now: float, limit: int) -> None:
+        # Caller holds the lock
+        heap = self._heap
+        while limit and heap and heap[0][0] <= now:
+            expires, token = heapq.heappop(heap)
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] == expires:
+                del self._entries[token]
+                self.expired += 1
+            limit -= 1
+
+    def add(self, token: str, data: Dict[str, Any], expires_at: float) -> None:
+        """Store data under token until the epoch time expires_at."""
+        now = time.time()
+        with self._lock:
+            self._sweep(now, SWEEP_BATCH)
+            self._entries[token] = (expires_at, data)
+            heapq.heappush(self._heap, (expires_at, token))
+            self.issued += 1
+
+    def issue(self, data: Dict[str, Any], ttl_seconds: float) -> Tuple[str, datetime]:
+        """New random token for data (stored with an ISO "expires_at"); returns (token, expiry)."""
+        token, expires_at, data = _new_token(data, ttl_seconds)
+        self.add(token, data, expires_at)
+        return token, datetime.fromtimestamp(expires_at)
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """The token's data, or None if unknown or expired."""
+        if not token:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is not None and entry[0] <= now:
+                del self._entries[token]
+                self.expired += 1
+                entry = None
+            self._sweep(now, SWEEP_BATCH)
+        return entry[1] if entry is not None else None
+
+    def _compact_heap(self) -> None:
+        # Caller holds the lock. Mostly removed tokens: rebuild from the live
+        # entries. Needs the heap to double first, so the cost stays amortised O(1).
+        if len(self._heap) > 2 * len(self._entries) + SWEEP_BATCH:
+            self._heap = [(expires, token) for token, (expires, _) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def remove(self, token: str) -> bool:
+        with self._lock:
+            removed = self._entries.pop(token, None) is not None
+            if removed:
+                self._compact_heap()
+            return removed
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry now; returns how many were dropped."""
+        with self._lock:
+            before = self.expired
+            self._sweep(time.time(), -1)
+            self._compact_heap()
+            return self.expired - before
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "memory",
+            "live": len(self._entries),
+            "heap_entries": len(self._heap),
+            "issued": self.issued,
+            "expired": self.expired,
+        }
+
+
+class SQLiteTokenStore:
+    """Sessions in a WAL-mode SQLite file shared by every worker on the machine."""
+
+    def __init__(self, path: str, name: str = "tokens"):
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self.issued = 0
+        self.expired = 0
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " token_hash TEXT PRIMARY KEY, store TEXT NOT NULL, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        connection.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+        connection.commit()
+
+    def _connection(self):
+        # sqlite3 connections are per thread; FastAPI runs sync endpoints on a pool
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            import sqlite3
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def __len__(self) -> int:
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM sessions WHERE store = ? AND expires_at > ?", (self.name, time.time())
+        ).fetchone()
+        return int(row[0])
+
+    def _maybe_purge(self, now: float) -> None:
+        if now - self._last_purge >= SHARED_PURGE_SECONDS:
+            self._last_purge = now
+            self.purge_expired()
+
+    def add(self, token: str, data: Dict[str, Any], expires_at: float) -> None:
+        self._connection().execute(
+            "INSERT OR REPLACE INTO sessions (token_hash, store, data, expires_at) VALUES (?, ?, ?, ?)",
+            (_token_key(token), self.name, json.dumps(data), expires_at),
+        )
+        self.issued += 1
+        self._maybe_purge(time.time())
+
+    def issue(self, data: Dict[str, Any], ttl_seconds: float) -> Tuple[str, datetime]:
+        token, expires_at, data = _new_token(data, ttl_seconds)
+        self.add(token, data, expires_at)
+        return token, datetime.fromtimestamp(expires_at)
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        if not token:
+            return None
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT data FROM sessions WHERE token_hash = ? AND store = ? AND expires_at > ?",
+            (_token_key(token), self.name, now),
+        ).fetchone()
+        self._maybe_purge(now)
+        return json.loads(row[0]) if row else None
+
+    def remove(self, token: str) -> bool:
+        cursor = self._connection().execute(
+            "DELETE FROM sessions WHERE token_hash = ? AND store = ?", (_token_key(token), self.name)
+        )
+        return cursor.rowcount > 0
+
+    def purge_expired(self) -> int:
+        cursor = self._connection().execute(
+            "DELETE FROM sessions WHERE store = ? AND expires_at <= ?", (self.name, time.time())
+        )
+        self.expired += max(0, cursor.rowcount)
+        return max(0, cursor.rowcount)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "live": len(self),
+            "issued": self.issued,
+            "expired": self.expired,
+        }
+
+
+class MongoTokenStore:
+    """
+    Sessions in MongoDB's "sessions" collection, read through a short local cache.
+
+    A session found in MongoDB is remembered for cache_seconds, so busy
+    students cost one round trip per interval rather than per request.
+    Unknown tokens are not cached (they may have just been issued by
+    another worker); a logout on another worker takes effect here within
+    cache_seconds.
+    """
+
+    def __init__(self, name: str = "tokens", cache_seconds: float = SESSION_CACHE_SECONDS):
+        self.name = name
+        self.cache_seconds = cache_seconds
+        self._cache = TokenStore(f"{name}-cache")
+        self._last_purge = 0.0
+        self.issued = 0
+        self.lookups = 0
+        self.cache_hits = 0
+
+    def _collection(self):
+        from database.mongo_db import get_database
+
+        return get_database().sessions
+
+    def __len__(self) -> int:
+        return self._collection().count_documents({"store": self.name, "expires_at": {"$gt": datetime.now(timezone.utc)}})
+
+    def _cache_put(self, token: str, data: Dict[str, Any], expires_at: float) -> None:
+        self._cache.add(token, data, min(expires_at, time.time() + self.cache_seconds))
+
+    def add(self, token: str, data: Dict[str, Any], expires_at: float) -> None:
+        # expires_at is stored as a BSON date (UTC) so the TTL index can expire it
+        self._collection().replace_one(
+            {"_id": _token_key(token)},
+            {"store": self.name, "data": data, "expires_at": datetime.fromtimestamp(expires_at, timezone.utc)},
+            upsert=True,
+        )
+        self.issued += 1
+        self._cache_put(token, data, expires_at)
+
+    def issue(self, data: Dict[str, Any], ttl_seconds: float) -> Tuple[str, datetime]:
+        token, expires_at, data = _new_token(data, ttl_seconds)
+        self.add(token, data, expires_at)
+        return token, datetime.fromtimestamp(expires_at)
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        if not token:
+            return None
+        self.lookups += 1
+        cached = self._cache.get(token)
+        if cached is not None:
+            self.cache_hits += 1
+            return cached
+        # The TTL monitor only runs about once a minute, so check expiry here too
+        doc = self._collection().find_one(
+            {"_id": _token_key(token), "store": self.name, "expires_at": {"$gt": datetime.now(timezone.utc)}}
+        )
+        if not doc:
+            return None
+        # pymongo hands dates back as naive UTC
+        self._cache_put(token, doc["data"], doc["expires_at"].replace(tzinfo=timezone.utc).timestamp())
+        return doc["data"]
+
+    def remove(self, token: str) -> bool:
+        self._cache.remove(token)
+        result = self._collection().delete_one({"_id": _token_key(token), "store": self.name})
+        return result.deleted_count > 0
+
+    def purge_expired(self) -> int:
+        """Expired sessions are deleted by MongoDB's TTL index; this only trims the local cache."""
+        return self._cache.purge_expired()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": "mongo",
+            "live": len(self),
+            "issued": self.issued,
+            "lookups": self.lookups,
+            "cache_hits": self.cache_hits,
+            "cache_entries": len(self._cache),
+            "cache_seconds": self.cache_seconds,
+        }
+
+
+def open_token_store(name: str, backend: str = SESSION_BACKEND):
+    """The SESSION_BACKEND store for one kind of session ("admin", "student")."""
+    if backend == "sqlite":
+        return SQLiteTokenStore(SESSION_SQLITE_PATH, name)
+    if backend == "mongo":
+        return MongoTokenStore(name)
+    return TokenStore(name)
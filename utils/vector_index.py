@@ -0,0 +1,498 @@
+"""
+utils/vector_index.py
+======================
+Storage backends for PDF chunk vectors, selected with VECTOR_BACKEND.
+
+  chroma (default) : ChromaDB through LangChain, stored in vector_db/
+  numpy            : normalized embeddings in a memory-mapped float32 or
+                     float16 array (vector_db/numpy/vectors.bin) plus a
+                     JSON sidecar with ids, texts and metadata. Search is
+                     one vectorized dot product + top-k — no Chroma
+                     client to start, and no per-query overhead beyond
+                     the matrix multiply. Fine for tens of thousands of
+                     chunks; deletes are tombstones until compaction.
+
+Both expose the same small interface PDFProcessor uses:
+upsert / existing_ids / get / iter_documents / delete / update_metadata /
+ids_for_source / query / count / compact / persist. Compare them with `python -m utils.bench_vector_index`.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from uuid import uuid4
+
+from utils.ann_index import ANN_MIN_ROWS, HNSWGraph, ann_enabled
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").strip().lower()
+VECTOR_DTYPE = os.getenv("VECTOR_DTYPE", "float32").strip().lower()
+EMBEDDING_DIM = 384
+
+# Matrix rows scored per step (float16 rows are upcast one block at a time)
+QUERY_BLOCK_ROWS = 65536
+
+# Chroma reads / writes in slices this big
+CHROMA_BATCH_SIZE = 1000
+
+# compact() builds the new collection under "<name><suffix>" before swapping it in
+CHROMA_COMPACT_SUFFIX = "_compacting"
+
+# (chunk id, document, metadata, score) — score is cosine similarity, higher is closer
+Hit = Tuple[str, str, Dict[str, Any], float]
+
+# (chunk id, document, metadata)
+Chunk = Tuple[str, str, Dict[str, Any]]
+
+
+class ChromaIndex:
+    """The LangChain Chroma store, behind the VectorIndex interface."""
+
+    backend = "chroma"
+
+    def __init__(self, directory: str, load_model: bool = True):
+        from langchain_community.vectorstores import Chroma
+
+        from utils.embeddings import get_embeddings
+
+        # Queries arrive as vectors; the model is only attached for LangChain callers
+        self.directory = directory
+        self._store = Chroma(
+            persist_directory=directory,
+            embedding_function=get_embeddings() if load_model else None,
+        )
+        self._recover_compaction()
+
+    def _compact_name(self) -> str:
+        return f"{self._store._collection.name}{CHROMA_COMPACT_SUFFIX}"
+
+    def _recover_compaction(self) -> None:
+        """Finish a compaction that stopped between dropping the old collection and renaming the new one."""
+        client = self._store._client
+        try:
+            rebuilt = client.get_collection(self._compact_name())
+        except Exception:
+            return
+        if self._store._collection.count() == 0 and rebuilt.count() > 0:
+            self._swap_in(rebuilt)
+        else:
+            # The old collection is intact, so the rebuild never finished
+            client.delete_collection(self._compact_name())
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        if not os.path.isdir(directory):
+            return False
+        return any(name != NumpyIndex.subdir for name in os.listdir(directory))
+
+    def upsert(self, ids: list, embeddings: list, metadatas: list, documents: list) -> None:
+        for start in range(0, len(ids), CHROMA_BATCH_SIZE):
+            end = start + CHROMA_BATCH_SIZE
+            self._store._collection.upsert(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                metadatas=metadatas[start:end],
+                documents=documents[start:end],
+            )
+
+    def existing_ids(self, ids: list) -> set:
+        found = set()
+        for start in range(0, len(ids), CHROMA_BATCH_SIZE):
+            result = self._store._collection.get(ids=ids[start:start + CHROMA_BATCH_SIZE], include=[])
+            found.update(result.get("ids") or [])
+        return found
+
+    def get(self, ids: list) -> List[Chunk]:
+        result = self._store._collection.get(ids=list(ids), include=["documents", "metadatas"])
+        return [
+            (cid, document, metadata or {})
+            for cid, document, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        ]
+
+    def iter_documents(self) -> Iterator[Chunk]:
+        collection = self._store._collection
+        for offset in range(0, collection.count(), CHROMA_BATCH_SIZE):
+            page = collection.get(limit=CHROMA_BATCH_SIZE, offset=offset, include=["documents", "metadatas"])
+            for cid, document, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+                yield cid, document, metadata or {}
+
+    def delete(self, ids: list) -> None:
+        for start in range(0, len(ids), CHROMA_BATCH_SIZE):
+            self._store._collection.delete(ids=ids[start:start + CHROMA_BATCH_SIZE])
+
+    def update_metadata(self, ids: list, metadatas: list) -> None:
+        for start in range(0, len(ids), CHROMA_BATCH_SIZE):
+            end = start + CHROMA_BATCH_SIZE
+            self._store._collection.update(ids=ids[start:end], metadatas=metadatas[start:end])
+
+    def ids_for_source(self, filename: str) -> list:
+        result = self._store._collection.get(where={"source_file": filename}, include=[])
+        return result.get("ids") or []
+
+    def query(self, vector: List[float], k: int) -> List[Hit]:
+        result = self._store._collection.query(
+            query_embeddings=[vector],
+            n_results=k,
+            include=["documents", "metadatas", "distances"],
+        )
+        ids = (result.get("ids") or [[]])[0]
+        documents = (result.get("documents") or [[]])[0]
+        metadatas = (result.get("metadatas") or [[]])[0]
+        distances = (result.get("distances") or [[]])[0]
+        # Default l2 space on unit vectors: distance = 2 - 2·cos
+        return [
+            (cid, document, metadata or {}, 1.0 - distance / 2.0)
+            for cid, document, metadata, distance in zip(ids, documents, metadatas, distances)
+        ]
+
+    def count(self) -> int:
+        return self._store._collection.count()
+
+    def compact(self, keep: Callable[[str, Dict[str, Any]], bool]) -> Tuple[int, int]:
+        """
+        Recreate the collection with only the rows keep() accepts; returns (before, after).
+
+        The kept rows are copied into a new collection first, and the old
+        one is only dropped once that copy is complete, so a crash or a
+        failed write leaves the old collection (or, at worst, the finished
+        copy, which the next open renames into place) rather than nothing.
+        """
+        client = self._store._client
+        collection = self._store._collection
+        before = collection.count()
+        try:
+            client.delete_collection(self._compact_name())  # leftover of an interrupted run
+        except Exception:
+            pass
+        rebuilt = client.create_collection(self._compact_name(), metadata=collection.metadata)
+        try:
+            kept = 0
+            for offset in range(0, before, CHROMA_BATCH_SIZE):
+                page = collection.get(
+                    limit=CHROMA_BATCH_SIZE,
+                    offset=offset,
+                    include=["embeddings", "metadatas", "documents"],
+                )
+                rows = [
+                    index for index, cid in enumerate(page["ids"])
+                    if keep(cid, page["metadatas"][index] or {})
+                ]
+                if rows:
+                    rebuilt.upsert(
+                        ids=[page["ids"][index] for index in rows],
+                        embeddings=[page["embeddings"][index] for index in rows],
+                        metadatas=[page["metadatas"][index] or {} for index in rows],
+                        documents=[page["documents"][index] for index in rows],
+                    )
+                    kept += len(rows)
+        except Exception:
+            client.delete_collection(self._compact_name())
+            raise
+
+        self._swap_in(rebuilt)
+        _vacuum_sqlite(os.path.join(self.directory, "chroma.sqlite3"))
+        return before, kept
+
+    def _swap_in(self, rebuilt) -> None:
+        """Replace the live collection with rebuilt, keeping its name."""
+        from langchain_community.vectorstores import Chroma
+
+        name = self._store._collection.name
+        embedding_function = self._store._embedding_function
+        self._store._client.delete_collection(name)
+        rebuilt.modify(name=name)
+        self._store = Chroma(
+            collection_name=name,
+            persist_directory=self.directory,
+            embedding_function=embedding_function,
+        )
+        self.persist()
+
+    def persist(self) -> None:
+        self._store.persist()
+
+
+class NumpyIndex:
+    """
+    Memory-mapped embedding matrix + JSON sidecar.
+
+    Files in <directory>:
+      vectors*.bin : row-major EMBEDDING_DIM-wide VECTOR_DTYPE rows, append-only
+      meta.json    : {"dim", "dtype", "file", "rows": [{"id", "document", "metadata"}]}
+                     — row i of the matrix in "file" belongs to rows[i];
+                     deleted rows have "deleted": true until compact() drops them
+
+    Vectors are appended before the sidecar is replaced (atomically), so a
+    crash between the two leaves extra matrix rows that the next open
+    truncates away. compact() writes a new matrix file and switches to it
+    by replacing the sidecar.
+
+    With VECTOR_ANN=hnsw a faiss graph over the matrix rows is kept next to
+    the matrix file (<file>.hnsw) for approximate search, see utils/ann_index.py.
+    """
+
+    backend = "numpy"
+    subdir = "numpy"
+
+    def __init__(self, directory: str, dtype: str = VECTOR_DTYPE):
+        import numpy as np
+
+        self.directory = directory
+        self._meta_path = os.path.join(directory, "meta.json")
+        self._lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+
+        meta = {"dim": EMBEDDING_DIM, "dtype": dtype, "file": "vectors.bin", "rows": []}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        self.dim = int(meta["dim"])
+        self.dtype = np.dtype(meta["dtype"])
+        self._vectors_path = os.path.join(directory, meta.get("file", "vectors.bin"))
+        self._rows: List[Dict[str, Any]] = meta["rows"]
+        self._row_of: Dict[str, int] = {
+            row["id"]: index for index, row in enumerate(self._rows) if not row.get("deleted")
+        }
+
+        row_bytes = self.dim * self.dtype.itemsize
+        expected = len(self._rows) * row_bytes
+        if not os.path.exists(self._vectors_path):
+            open(self._vectors_path, "wb").close()
+        if os.path.getsize(self._vectors_path) > expected:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(expected)
+        self._ann = None
+        self._use_ann = ann_enabled()
+        self._refresh()
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, "meta.json"))
+
+    def _map(self, rows: int):
+        import numpy as np
+
+        if rows == 0:
+            return np.zeros((0, self.dim), dtype=self.dtype)
+        return np.memmap(self._vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+
+    def upsert(self, ids: list, embeddings: list, metadatas: list, documents: list) -> None:
+        import numpy as np
+
+        if not ids:
+            return
+        with self._lock:
+            # Replacing an id = tombstone the old row, append the new one
+            for cid in ids:
+                old = self._row_of.get(cid)
+                if old is not None:
+                    self._rows[old]["deleted"] = True
+            block = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), self.dim)
+            with open(self._vectors_path, "ab") as f:
+                f.write(block.astype(self.dtype).tobytes())
+
+            start = len(self._rows)
+            for offset, (cid, metadata, document) in enumerate(zip(ids, metadatas, documents)):
+                self._rows.append({"id": cid, "document": document, "metadata": metadata or {}})
+                self._row_of[cid] = start + offset
+            self._refresh()
+
+    def existing_ids(self, ids: list) -> set:
+        with self._lock:
+            return {cid for cid in ids if cid in self._row_of}
+
+    def get(self, ids: list) -> List[Chunk]:
+        with self._lock:
+            rows = [self._rows[self._row_of[cid]] for cid in ids if cid in self._row_of]
+        return [(row["id"], row["document"], row["metadata"]) for row in rows]
+
+    def iter_documents(self) -> Iterator[Chunk]:
+        with self._lock:
+            rows = [self._rows[index] for index in self._row_of.values()]
+        for row in rows:
+            yield row["id"], row["document"], row["metadata"]
+
+    def delete(self, ids: list) -> None:
+        with self._lock:
+            for cid in ids:
+                row = self._row_of.pop(cid, None)
+                if row is not None:
+                    self._rows[row]["deleted"] = True
+            self._refresh()
+
+    def update_metadata(self, ids: list, metadatas: list) -> None:
+        with self._lock:
+            for cid, metadata in zip(ids, metadatas):
+                row = self._row_of.get(cid)
+                if row is not None:
+                    self._rows[row]["metadata"] = metadata or {}
+
+    def ids_for_source(self, filename: str) -> list:
+        with self._lock:
+            return [
+                cid for cid, row in self._row_of.items()
+                if self._rows[row]["metadata"].get("source_file") == filename
+            ]
+
+    def _refresh(self) -> None:
+        import numpy as np
+
+        self._alive = np.array([not row.get("deleted") for row in self._rows], dtype=bool)
+        self._matrix = self._map(len(self._rows))
+        self._sync_ann()
+
+    def _sync_ann(self) -> None:
+        """Create the ANN graph once the index is big enough, then append new rows to it."""
+        if not self._use_ann:
+            return
+        total = len(self._rows)
+        if self._ann is None:
+            if total < ANN_MIN_ROWS:
+                return
+            path = self._vectors_path + ".hnsw"
+            self._ann = HNSWGraph(self.dim, half_precision=self.dtype.itemsize == 2, path=path)
+            if self._ann.size > total:
+                # Graph is ahead of the sidecar (crash mid-write): start over
+                os.remove(path)
+                self._ann = HNSWGraph(self.dim, half_precision=self.dtype.itemsize == 2, path=path)
+        added = self._ann.extend(self._matrix)
+        if added > 1000:
+            print(f"🕸️  ANN graph: inserted {added} chunks ({self._ann.size} total)")
+
+    @property
+    def matrix(self):
+        """The memory-mapped embedding matrix (including deleted rows)."""
+        return self._matrix
+
+    @property
+    def ann(self):
+        """The HNSW graph, or None while search is exact."""
+        return self._ann
+
+    def query(self, vector: List[float], k: int, exact: bool = False) -> List[Hit]:
+        import numpy as np
+
+        with self._lock:
+            matrix, alive, rows = self._matrix, self._alive, self._rows
+            if self._ann is not None and not exact and k > 0:
+                return self._query_ann(vector, k)
+        total = matrix.shape[0]
+        if total == 0 or k <= 0:
+            return []
+
+        q = np.asarray(vector, dtype=np.float32)
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, QUERY_BLOCK_ROWS):
+            end = min(start + QUERY_BLOCK_ROWS, total)
+            scores[start:end] = np.asarray(matrix[start:end], dtype=np.float32) @ q
+        scores[~alive[:total]] = -np.inf
+
+        k = min(k, int(alive[:total].sum()))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(rows[i]["id"], rows[i]["document"], rows[i]["metadata"], float(scores[i])) for i in top]
+
+    def _query_ann(self, vector: List[float], k: int) -> List[Hit]:
+        """Graph search; deleted rows are skipped, asking for more until k live ones turn up."""
+        total = len(self._rows)
+        live = len(self._row_of)
+        want = min(k, live)
+        fetch = min(total, 2 * k)
+        while True:
+            found, scores = self._ann.search(vector, fetch)
+            hits = [
+                (self._rows[row]["id"], self._rows[row]["document"], self._rows[row]["metadata"], score)
+                for row, score in zip(found, scores)
+                if self._alive[row]
+            ]
+            if len(hits) >= want or fetch >= total:
+                return hits[:k]
+            fetch = min(total, fetch * 4)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._row_of)
+
+    def compact(self, keep: Callable[[str, Dict[str, Any]], bool]) -> Tuple[int, int]:
+        """Rewrite both files with only live rows keep() accepts; returns (before, after)."""
+        import numpy as np
+
+        with self._lock:
+            before = len(self._row_of)
+            selected = [
+                index for index, row in enumerate(self._rows)
+                if not row.get("deleted") and keep(row["id"], row["metadata"])
+            ]
+            block = np.array(self._matrix[selected], dtype=self.dtype) if selected else np.zeros((0, self.dim), dtype=self.dtype)
+            self._matrix = None  # release the old mapping before removing the file
+            old_ann = self._ann.path if self._ann is not None else ""
+            self._ann = None  # graph node numbers follow matrix rows; rebuild it
+
+            old_path = self._vectors_path
+            self._vectors_path = os.path.join(self.directory, f"vectors-{uuid4().hex[:8]}.bin")
+            with open(self._vectors_path, "wb") as f:
+                f.write(block.tobytes())
+            self._rows = [self._rows[index] for index in selected]
+            self._row_of = {row["id"]: index for index, row in enumerate(self._rows)}
+            self.persist()  # the sidecar switch is the commit point
+            os.remove(old_path)
+            if old_ann and os.path.exists(old_ann):
+                os.remove(old_ann)
+            self._refresh()
+            if self._ann is not None:
+                self._ann.save()
+            return before, len(self._rows)
+
+    def persist(self) -> None:
+        with self._lock:
+            tmp_path = self._meta_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {
+                        "dim": self.dim,
+                        "dtype": self.dtype.name,
+                        "file": os.path.basename(self._vectors_path),
+                        "rows": self._rows,
+                    },
+                    f,
+                )
+            os.replace(tmp_path, self._meta_path)
+            if self._ann is not None:
+                self._ann.save()
+
+
+def index_directory(root: str, backend: str = VECTOR_BACKEND) -> str:
+    return os.path.join(root, NumpyIndex.subdir) if backend == "numpy" else root
+
+
+def open_index(root: str, create: bool = False, backend: str = VECTOR_BACKEND):
+    """
+    Open the configured backend under root (the vector_db folder).
+
+    Returns None when nothing has been stored yet and create is False.
+    """
+    directory = index_directory(root, backend)
+    cls = NumpyIndex if backend == "numpy" else ChromaIndex
+    if not create and not cls.exists(directory):
+        return None
+    return cls(directory)
+
+
+def _vacuum_sqlite(path: str) -> None:
+    """Give space freed by deleted rows back to the filesystem (best effort)."""
+    if not os.path.exists(path):
+        return
+    try:
+        import sqlite3
+
+        connection = sqlite3.connect(path)
+        try:
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+    except Exception as e:
+        print(f"⚠️  Could not vacuum {path}: {e}")